@@ -0,0 +1,37 @@
+"""unique box_id on boxes
+
+Revision ID: 7a3e9c41d2b8
+Revises: 5d9ab5ff8b5c
+Create Date: 2026-10-18 08:10:12.418203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '7a3e9c41d2b8'
+down_revision = '5d9ab5ff8b5c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # overlapping scan windows may have left duplicates; keep the first
+    op.execute('''
+        delete from boxes
+        where id in (
+            select id
+            from (
+                select id, row_number() over(partition by box_id order by id) as r
+                from boxes
+            ) b
+            where b.r > 1
+        )
+    ''')
+    op.create_index('uq_boxes_box_id', 'boxes', ['box_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_boxes_box_id', table_name='boxes')
@@ -0,0 +1,119 @@
+"""utxo_registers
+
+Revision ID: a7c3e5f19b42
+Revises: f2a8c6d41e97
+Create Date: 2026-10-18 10:41:37.905126
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e5f19b42'
+down_revision = 'f2a8c6d41e97'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # decoded registers of unspent boxes (see utils/ergo.decode_register); type is the sigma type code
+    # token_id is set for 32 byte Coll[Byte] (token/box id references)
+    op.execute('''
+        create table utxo_registers (
+            box_id varchar(64) not null references utxos (box_id) on delete cascade,
+            register varchar(2) not null,
+            type smallint not null,
+            token_id varchar(64),
+            coll_byte text,
+            long bigint,
+            coll_long bigint[],
+            constraint utxo_registers_pkey primary key (box_id, register)
+        )
+    ''')
+
+    # existing utxos, decoded as plugins/utxo.register_values does for new boxes (app code is not available here)
+    op.execute('''
+    -- utils/ergo.decode_register, for rows written before ingestion decoded registers
+    create function pg_temp.vlq(data bytea, pos int, out value numeric, out next int) as $$
+    declare
+        b int;
+        shift int := 0;
+    begin
+        value := 0;
+        next := pos;
+        loop
+            b := get_byte(data, next);
+            next := next + 1;
+            value := value + (b & 127) * power(2::numeric, shift);
+            exit when b & 128 = 0;
+            shift := shift + 7;
+        end loop;
+    end
+    $$ language plpgsql immutable;
+
+    create function pg_temp.zigzag(n numeric) returns bigint as $$
+        select (case when n % 2 = 0 then div(n, 2) else -div(n + 1, 2) end)::bigint
+    $$ language sql immutable;
+
+    -- (type, coll_byte, long, coll_long) for Int, Long, Coll[Byte], Coll[Long]; all null for anything else
+    create function pg_temp.decode_register(serialized text, out t smallint, out cb text, out l bigint, out cl bigint[]) as $$
+    declare
+        data bytea;
+        kind int;
+        v record;
+        pos int;
+    begin
+        data := decode(serialized, 'hex');
+        kind := get_byte(data, 0);
+        select * into v from pg_temp.vlq(data, 1);
+        pos := v.next;
+        if kind in (4, 5) then
+            l := pg_temp.zigzag(v.value);
+        elsif kind = 14 then
+            cb := encode(substr(data, pos + 1, v.value::int), 'hex');
+            pos := pos + v.value::int;
+        elsif kind = 17 then
+            cl := '{}';
+            for i in 1..v.value::int loop
+                select * into v from pg_temp.vlq(data, pos);
+                pos := v.next;
+                cl := cl || pg_temp.zigzag(v.value);
+            end loop;
+        else
+            return;
+        end if;
+
+        -- trailing or missing bytes
+        if pos <> length(data) then
+            cb := null; l := null; cl := null;
+            return;
+        end if;
+        t := kind;
+
+    exception when others then
+        t := null; cb := null; l := null; cl := null;
+    end
+    $$ language plpgsql immutable;
+    ''')
+    op.execute('''
+        insert into utxo_registers (box_id, register, type, token_id, coll_byte, long, coll_long)
+            select u.box_id
+                , r.key
+                , d.t
+                , case when length(d.cb) = 64 then d.cb end
+                , d.cb
+                , d.l
+                , d.cl
+            from utxos u, each(u.registers) r, pg_temp.decode_register(r.value) d
+            where d.t is not null
+        on conflict do nothing
+    ''')
+
+    op.create_index('idx_utxo_registers_token_id', 'utxo_registers', ['token_id'], unique=False, postgresql_where=sa.text('token_id is not null'))
+
+
+def downgrade() -> None:
+    op.drop_index('idx_utxo_registers_token_id', table_name='utxo_registers')
+    op.drop_table('utxo_registers')
@@ -0,0 +1,35 @@
+"""utxos progress
+
+Revision ID: b4e1f09c7d25
+Revises: 7a3e9c41d2b8
+Create Date: 2026-10-18 08:31:47.102365
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4e1f09c7d25'
+down_revision = '7a3e9c41d2b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # last box committed by the utxo plugin, per boxes table; cleared when a run completes
+    op.create_table('utxos_progress',
+    sa.Column('boxes_table', sa.VARCHAR(length=64), nullable=False),
+    sa.Column('height', sa.INTEGER(), nullable=False),
+    sa.Column('box_id', sa.VARCHAR(length=64), nullable=False),
+    sa.Column('updated_at', postgresql.TIMESTAMP(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('boxes_table', name='utxos_progress_pkey')
+    )
+    # keyset order for streaming boxes missing from utxos
+    op.create_index('idx_boxes_height_box_id', 'boxes', ['height', 'box_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_boxes_height_box_id', table_name='boxes')
+    op.drop_table('utxos_progress')
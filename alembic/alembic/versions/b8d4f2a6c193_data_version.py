@@ -0,0 +1,26 @@
+"""data_version
+
+Revision ID: b8d4f2a6c193
+Revises: a7c3e5f19b42
+Create Date: 2026-10-18 11:32:08.614027
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8d4f2a6c193'
+down_revision = 'a7c3e5f19b42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # bumped after writes that change api responses; part of the api response cache key (app/utils/cache.py)
+    op.execute('create sequence data_version')
+
+
+def downgrade() -> None:
+    op.execute('drop sequence data_version')
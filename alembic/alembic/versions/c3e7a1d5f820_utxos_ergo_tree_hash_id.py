@@ -0,0 +1,28 @@
+"""utxos ergo_tree_hash, id
+
+Revision ID: c3e7a1d5f820
+Revises: b8d4f2a6c193
+Create Date: 2026-10-18 12:04:37.518230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e7a1d5f820'
+down_revision = 'b8d4f2a6c193'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # byErgoTree pages by id within a tree (keyset); the index returns them in order, and still serves lookups by ergo_tree_hash alone
+    op.create_index('idx_utxos_ergo_tree_hash_id', 'utxos', ['ergo_tree_hash', 'id'], unique=False)
+    op.drop_index('idx_utxos_ergo_tree_hash', table_name='utxos')
+
+
+def downgrade() -> None:
+    op.create_index('idx_utxos_ergo_tree_hash', 'utxos', ['ergo_tree_hash'], unique=False)
+    op.drop_index('idx_utxos_ergo_tree_hash_id', table_name='utxos')
@@ -0,0 +1,30 @@
+"""boxes spent journal
+
+Revision ID: c81d5a3e6f47
+Revises: b4e1f09c7d25
+Create Date: 2026-10-18 08:44:03.518920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81d5a3e6f47'
+down_revision = 'b4e1f09c7d25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # boxes removed from boxes by the scanner, until the utxo plugin removes them from utxos
+    op.create_table('boxes_spent',
+    sa.Column('box_id', sa.VARCHAR(length=64), nullable=False),
+    sa.Column('height', sa.INTEGER(), nullable=True),
+    sa.PrimaryKeyConstraint('box_id', name='boxes_spent_pkey')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('boxes_spent')
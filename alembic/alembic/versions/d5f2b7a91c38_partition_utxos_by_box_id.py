@@ -0,0 +1,101 @@
+"""partition utxos by box_id
+
+Revision ID: d5f2b7a91c38
+Revises: c81d5a3e6f47
+Create Date: 2026-10-18 09:02:26.731554
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5f2b7a91c38'
+down_revision = 'c81d5a3e6f47'
+branch_labels = None
+depends_on = None
+
+# hash partitions of utxos (utxos_p0..); inserts go through the parent, so nothing else depends on the count
+PARTITIONS = 16
+COLUMNS = 'id, box_id, ergo_tree, address, nergs, registers, assets, transaction_id, creation_height, height, index, assets_array'
+
+
+def upgrade() -> None:
+    op.execute('''
+        alter table utxos rename to utxos_unpartitioned;
+        alter table utxos_unpartitioned rename constraint utxos_pkey to utxos_unpartitioned_pkey;
+        alter table utxos_unpartitioned rename constraint utxos_box_id_key to utxos_unpartitioned_box_id_key;
+        drop index if exists uq_utxos_boxid;
+        drop index if exists idx_utxos;
+        drop index if exists idx_utxos_ergo_tree;
+        alter sequence utxos_id_seq owned by none;
+    ''')
+
+    # hash of box_id; primary key must include the partition key, and box_id is what upserts conflict on
+    op.execute('''
+        create table utxos (
+            id integer not null default nextval('utxos_id_seq'),
+            box_id varchar(64) not null,
+            ergo_tree text,
+            address varchar(64) not null,
+            nergs bigint,
+            registers hstore,
+            assets hstore,
+            transaction_id varchar(64),
+            creation_height integer,
+            height integer not null,
+            index integer,
+            assets_array hstore[],
+            constraint utxos_pkey primary key (box_id)
+        ) partition by hash (box_id);
+        alter sequence utxos_id_seq owned by utxos.id;
+    ''')
+    for i in range(PARTITIONS):
+        op.execute(f'create table utxos_p{i} partition of utxos for values with (modulus {PARTITIONS}, remainder {i})')
+
+    # narrow indexes, created per partition; the wide (box_id, ergo_tree, address, nergs, transaction_id, height) index is gone
+    op.create_index('idx_utxos_ergo_tree', 'utxos', ['ergo_tree'], unique=False)
+    op.create_index('idx_utxos_address', 'utxos', ['address'], unique=False)
+
+    # dependent matviews are dropped here and rebuilt by the api at startup (utils/db.init_db)
+    op.execute(f'''
+        insert into utxos ({COLUMNS}) select {COLUMNS} from utxos_unpartitioned;
+        drop table utxos_unpartitioned cascade;
+    ''')
+
+
+def downgrade() -> None:
+    op.execute('''
+        alter table utxos rename to utxos_partitioned;
+        alter table utxos_partitioned rename constraint utxos_pkey to utxos_partitioned_pkey;
+        drop index if exists idx_utxos_ergo_tree;
+        drop index if exists idx_utxos_address;
+        alter sequence utxos_id_seq owned by none;
+    ''')
+    op.execute('''
+        create table utxos (
+            id integer not null default nextval('utxos_id_seq'),
+            box_id varchar(64) not null,
+            ergo_tree text,
+            address varchar(64) not null,
+            nergs bigint,
+            registers hstore,
+            assets hstore,
+            transaction_id varchar(64),
+            creation_height integer,
+            height integer not null,
+            index integer,
+            assets_array hstore[],
+            constraint utxos_pkey primary key (id),
+            constraint utxos_box_id_key unique (box_id)
+        );
+        alter sequence utxos_id_seq owned by utxos.id;
+    ''')
+    op.create_index('uq_utxos_boxid', 'utxos', ['box_id'], unique=False)
+    op.create_index('idx_utxos', 'utxos', ['box_id', 'ergo_tree', 'address', 'nergs', 'transaction_id', 'height'], unique=False)
+    op.create_index('idx_utxos_ergo_tree', 'utxos', ['ergo_tree'], unique=False)
+    op.execute(f'''
+        insert into utxos ({COLUMNS}) select {COLUMNS} from utxos_partitioned;
+        drop table utxos_partitioned cascade;
+    ''')
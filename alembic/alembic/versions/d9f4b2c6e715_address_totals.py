@@ -0,0 +1,58 @@
+"""address_balances, address_tokens
+
+Revision ID: d9f4b2c6e715
+Revises: c3e7a1d5f820
+Create Date: 2026-10-18 12:41:53.902716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9f4b2c6e715'
+down_revision = 'c3e7a1d5f820'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # unspent totals per wallet address; plugins/utxo adds boxes as they are inserted and subtracts them as they are spent
+    op.execute('''
+        create table address_balances (
+            address varchar(64) not null,
+            nergs bigint not null,
+            boxes int not null,
+            constraint address_balances_pkey primary key (address)
+        )
+    ''')
+    op.execute('''
+        create table address_tokens (
+            address varchar(64) not null,
+            token_id varchar(64) not null,
+            amount bigint not null,
+            constraint address_tokens_pkey primary key (address, token_id)
+        )
+    ''')
+
+    # existing utxos
+    op.execute('''
+        insert into address_balances (address, nergs, boxes)
+            select address, sum(nergs), count(*)
+            from utxos
+            where address != ''
+            group by address
+    ''')
+    op.execute('''
+        insert into address_tokens (address, token_id, amount)
+            select address, token_id, sum(amount)
+            from utxo_assets
+            where address != ''
+            group by address, token_id
+    ''')
+
+
+def downgrade() -> None:
+    op.drop_table('address_tokens')
+    op.drop_table('address_balances')
@@ -0,0 +1,32 @@
+"""ergo_tree_hash on utxos
+
+Revision ID: e93a4c0b2d16
+Revises: d5f2b7a91c38
+Create Date: 2026-10-18 09:20:51.204419
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e93a4c0b2d16'
+down_revision = 'd5f2b7a91c38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # sha256 of the ergo tree bytes, kept by postgres on insert; lookups compare 32 bytes instead of kilobytes of text
+    op.execute('''
+        alter table utxos add column ergo_tree_hash bytea generated always as (sha256(decode(ergo_tree, 'hex'))) stored
+    ''')
+    op.drop_index('idx_utxos_ergo_tree', table_name='utxos')
+    op.create_index('idx_utxos_ergo_tree_hash', 'utxos', ['ergo_tree_hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_utxos_ergo_tree_hash', table_name='utxos')
+    op.create_index('idx_utxos_ergo_tree', 'utxos', ['ergo_tree'], unique=False)
+    op.drop_column('utxos', 'ergo_tree_hash')
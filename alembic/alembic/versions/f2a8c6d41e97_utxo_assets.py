@@ -0,0 +1,47 @@
+"""utxo_assets
+
+Revision ID: f2a8c6d41e97
+Revises: e93a4c0b2d16
+Create Date: 2026-10-18 10:05:12.318842
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a8c6d41e97'
+down_revision = 'e93a4c0b2d16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # one row per token in an unspent box; removed along with the box
+    op.execute('''
+        create table utxo_assets (
+            box_id varchar(64) not null references utxos (box_id) on delete cascade,
+            address varchar(64) not null,
+            token_id varchar(64) not null,
+            amount bigint not null,
+            constraint utxo_assets_pkey primary key (box_id, token_id)
+        )
+    ''')
+
+    # existing utxos; from here on plugins/utxo.checkpoint keeps it current
+    op.execute('''
+        insert into utxo_assets (box_id, address, token_id, amount)
+            select u.box_id, u.address, a.key, a.value::bigint
+            from utxos u, each(u.assets) a
+        on conflict do nothing
+    ''')
+
+    op.create_index('idx_utxo_assets_token_id', 'utxo_assets', ['token_id'], unique=False)
+    op.create_index('idx_utxo_assets_address_token_id', 'utxo_assets', ['address', 'token_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_utxo_assets_address_token_id', table_name='utxo_assets')
+    op.drop_index('idx_utxo_assets_token_id', table_name='utxo_assets')
+    op.drop_table('utxo_assets')
@@ -4,7 +4,7 @@ from time import time
 from os import getpid
 from fastapi import FastAPI, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from utils.db import init_db, refresh_views
+from utils.db import init_db, refresh_views, aeng
 from utils.logger import logger, myself, LEIF
 from uuid import UUID, uuid4
 from pydantic import BaseModel, Field
@@ -19,7 +19,7 @@ from routes.snapshot import snapshot_router
 from routes.token import token_router
 from routes.tasks import tasks_router
 from routes.utxo import utxo_router
-# from routes.dashboard import dashboard_router
+from routes.dashboard import dashboard_router
 
 app = FastAPI(
     title="Danaides",
@@ -45,7 +45,7 @@ app.include_router(snapshot_router, prefix="/api/snapshot", tags=["snapshot"])
 app.include_router(token_router, prefix="/api/token", tags=["token"])
 app.include_router(tasks_router, prefix="/api/tasks", tags=["tasks"])
 app.include_router(utxo_router, prefix="/api/utxo", tags=["utxo"])
-# app.include_router(dashboard_router, prefix="/api/dashboard", tags=["dashboard"]) #, dependencies=[Depends(get_current_active_user)])
+app.include_router(dashboard_router, prefix="/api/dashboard", tags=["dashboard"]) #, dependencies=[Depends(get_current_active_user)])
 #endregion Routers
 
 origins = [
@@ -74,6 +74,10 @@ async def on_startup():
     except Exception as e:
         logger.error(f'ERR: {myself()}; {e}')
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    await aeng.dispose()
+
 @app.middleware("http")
 async def add_logging_and_process_time(req: Request, call_next):
     try:
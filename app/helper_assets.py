@@ -8,7 +8,7 @@ from time import sleep
 from utils.db import eng
 from utils.logger import logger, myself, Timer, printProgressBar, LEIF
 from utils.ergo import get_node_info, NODE_API
-from utils.aioreq import get_json_ordered
+from utils.aioreq import get_json_ordered_retry, FETCHER
 from ergo_python_appkit.appkit import ErgoAppKit, ErgoValue
 
 """
@@ -152,33 +152,11 @@ def cli():
 
     return args
 
-async def get_all(urls) -> dict:
-    retries = 1
-    res = {}
+async def get_all(urls) -> list:
     headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 6.1; Trident/7.0; rv:11.0) like Gecko', "Content-Type": "application/json"} # {'Content-Type': 'application/json'}
 
-    # try until successful; missing a valid response will invalidate the database
-    while retries > 0:
-        # loop 3 times, then pause
-        while res == {} and (retries%3 > 0):
-            try:
-                res = await get_json_ordered(urls, headers)
-                retries = 0
-
-            # try, try again
-            except Exception as e:
-                retries += 1
-                res = {}
-                logger.warning(f'retry: {retries} ({e})')
-
-        # take a beat
-        if retries > 0:
-            logger.warning(f'WARN: {retries} retries; sleeping for 20s.')
-            sleep(20)
-            retries = 1
-            res = {}
-    
-    return res
+    # missing a valid response will invalidate the database; only failed requests are retried, and raise if the node keeps failing
+    return await get_json_ordered_retry(urls, headers)
 
 #region MAIN
 # goal of main is to refresh all tokens
@@ -260,6 +238,7 @@ async def main(args):
     except Exception as e:
         logger.error(f'ERR: {myself()}; {e}')
 
+    await FETCHER.close()
     return None
 
 if __name__ == '__main__':    
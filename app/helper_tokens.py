@@ -1,14 +1,13 @@
 import asyncio
 import os, sys
-import pandas as pd
 import argparse
 
 from requests import get
 from time import sleep
-from utils.db import eng
+from utils.db import eng, copy_rows
 from utils.logger import logger, myself, Timer, printProgressBar, LEIF
 from utils.ergo import get_node_info, NODE_API
-from utils.aioreq import get_json_ordered
+from utils.aioreq import get_json_ordered_retry, FETCHER
 from ergo_python_appkit.appkit import ErgoAppKit, ErgoValue
 
 """
@@ -33,17 +32,12 @@ async def refresh(height, tokens):
         # init
         stats = {}
 
-        # dataframe - create dataset to push to sql table
+        # bulk load dataset to sql staging table
         if VERBOSE: logger.debug(tokens)
-        df = pd.DataFrame.from_dict({
-            'token_id': list(tokens.keys()), 
-            'height': [n['height'] for n in tokens.values()], 
-            'amount': [n['amount'] for n in tokens.values()],
-            'token_name': [n['token_name'] for n in tokens.values()],
-            'decimals': [n['decimals'] for n in tokens.values()], 
-        })
-        if VERBOSE: logger.warning(df)
-        df.to_sql(f'{TOKENS}_refresh', eng, schema='checkpoint', if_exists='replace')
+        with eng.begin() as con:
+            copy_rows(con, f'{TOKENS}_refresh', ['token_id', 'height', 'amount', 'token_name', 'decimals'], (
+                (token_id, n['height'], n['amount'], n['token_name'], n['decimals']) for token_id, n in tokens.items()
+            ), schema='tokens')
         if VERBOSE: logger.debug(f'saved to checkpoint.{TOKENS}_refresh')
 
         # stats - find new/existing tokens
@@ -190,33 +184,11 @@ def cli():
 
     return args
 
-async def get_all(urls) -> dict:
-    retries = 1
-    res = {}
+async def get_all(urls) -> list:
     headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 6.1; Trident/7.0; rv:11.0) like Gecko', "Content-Type": "application/json"} # {'Content-Type': 'application/json'}
 
-    # try until successful; missing a valid response will invalidate the database
-    while retries > 0:
-        # loop 3 times, then pause
-        while res == {} and (retries%3 > 0):
-            try:
-                res = await get_json_ordered(urls, headers)
-                retries = 0
-
-            # try, try again
-            except Exception as e:
-                retries += 1
-                res = {}
-                logger.warning(f'retry: {retries} ({e})')
-
-        # take a beat
-        if retries > 0:
-            logger.warning(f'WARN: {retries} retries; sleeping for 20s.')
-            sleep(20)
-            retries = 1
-            res = {}
-    
-    return res
+    # missing a valid response will invalidate the database; only failed requests are retried, and raise if the node keeps failing
+    return await get_json_ordered_retry(urls, headers)
 
 #region MAIN
 # goal of main is to refresh all tokens
@@ -328,6 +300,7 @@ async def main(args):
             'message': e
         }
 
+    await FETCHER.close()
     return fin
 
 if __name__ == '__main__':    
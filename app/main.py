@@ -1,16 +1,22 @@
 import asyncio
 import os, sys, signal
-import pandas as pd
 import argparse
 import requests
+import multiprocessing
 
-from time import sleep, time
+from time import sleep, time, perf_counter
+from concurrent.futures import ProcessPoolExecutor
 from config import dotdict
 from prettytable import PrettyTable
-from utils.db import eng, text
+from utils.db import eng, text, copy_rows, bump_data_version, INCREMENTAL_VIEWS, INCREMENTAL_TABLES
 from utils.logger import logger, myself, Timer, printProgressBar, LEIF
 from utils.ergo import get_node_info, get_genesis_block, NODE_API
-from utils.aioreq import get_json_ordered
+from utils.aioreq import get_json_ordered_retry, FETCHER
+from utils.utxocache import UtxoCache
+from utils.boxset import BoxSet
+from utils.window import WindowSizer
+from utils.refresh import RefreshScheduler, CHANGES
+from utils import incremental
 from sqlalchemy.exc import OperationalError
 from plugins import prices, utxo, token
 # from ergo_python_appkit.appkit import ErgoAppKit, ErgoValue
@@ -21,7 +27,19 @@ SUMMARY_INFO = {'time': time()}
 RECENT_BLOCKS = {}
 PRETTYPRINT = False
 VERBOSE = False
-FETCH_INTERVAL = 500
+FETCH_INTERVAL = 500 # initial window; adapts between FETCH_MIN and FETCH_MAX (see utils/window.py)
+FETCH_MIN = 50
+FETCH_MAX = 5000
+PIPELINE_DEPTH = 2 # windows buffered between fetch, apply and write stages
+DELTA_APPLY = True # apply boxes checkpoint as arrays of spent/unspent; otherwise stage with COPY and anti-join
+UTXO_CACHE = 0 # boxes held in memory across windows (beyond this, spill to disk); 0 writes every window
+UTXO_FLUSH = 10 # windows held in utxo cache before flushing to postgres
+RANGE_FETCH = True # headers via /blocks/chainSlice, bodies via /blocks/headerIds; otherwise one request per block
+BLOCK_BATCH = 50 # block bodies per /blocks/headerIds request
+BLOCK_BATCH_TIMEOUT = 60 # seconds; full blocks are large
+RESYNC_WORKERS = 0 # processes scanning block ranges in parallel when far behind; 0 scans in order
+REFRESH_VIEWS = ['staking', 'vesting', 'assets', 'balances', 'tokenomics_ergopad', 'tokenomics_paideia', 'unspent_by_token', 'token_status', 'token_free', 'token_staked', 'token_locked']
+REFRESH_WORKERS = 4 # matviews refreshed at once (see utils/refresh.py)
 LINELEN = 100
 PLUGINS = dotdict({
     'staking': True, 
@@ -37,17 +55,15 @@ BLIPS = []
 
 #region FUNCTIONS
 # remove all inputs from current block
-async def del_inputs(inputs: dict, unspent: dict, height: int=-1) -> dict:
+async def del_inputs(inputs: dict, unspent: BoxSet, height: int=-1, utxos: dict=None) -> BoxSet:
     try:
         new = unspent
         for i in inputs:
             box_id = i['boxId']
             try:
-                # new[box_id] = height
-                new[box_id] = {
-                    'height': height, # -1 indicates spent; see checkpoint (is_unspent in checkpoint.boxes table)
-                    'nergs': 0
-                }
+                # height -1 indicates spent; see checkpoint (is_unspent in checkpoint.boxes table)
+                new.spend(box_id)
+                if utxos is not None: utxos.pop(box_id, None)
             except Exception as e:
                 BLIPS.append({'box_id': box_id, 'height': height, 'msg': f'cant remove'})
                 if VERBOSE: logger.warning(f'cant find {box_id} at height {height} while removing from unspent {e}')
@@ -55,10 +71,10 @@ async def del_inputs(inputs: dict, unspent: dict, height: int=-1) -> dict:
 
     except Exception as e:
         logger.error(f'ERR: find tokens {e}')
-        return {}
+        return BoxSet()
 
 # add all outputs from current block
-async def add_outputs(outputs: dict, unspent: dict, height: int) -> dict:
+async def add_outputs(outputs: dict, unspent: BoxSet, height: int, utxos: dict=None) -> BoxSet:
     try:
         new = unspent
         for o in outputs:
@@ -66,11 +82,8 @@ async def add_outputs(outputs: dict, unspent: dict, height: int) -> dict:
             nergs = o['value']
             # amount = o['value']
             try:
-                # new[box_id] = height
-                new[box_id] = {
-                    'height': height,
-                    'nergs': nergs
-                }
+                new.add(box_id, height, nergs)
+                if utxos is not None: utxos[box_id] = utxo.utxo_row(o, height)
             except Exception as e:
                 BLIPS.append({'box_id': box_id, 'height': height, 'msg': f'cant add'})
                 if VERBOSE: logger.warning(f'{box_id} exists at height {height} while adding to unspent {e}')
@@ -78,52 +91,100 @@ async def add_outputs(outputs: dict, unspent: dict, height: int) -> dict:
 
     except Exception as e:
         logger.error(f'ERR: add outputs {e}')
-        return {}
+        return BoxSet()
 
 # upsert current chunk
-async def checkpoint(height: int, unspent: dict, tokens: dict) -> None:
+async def checkpoint(height: int, unspent: BoxSet, tokens: dict, utxos: dict=None) -> None:
     try:
         # unspent
-        if VERBOSE: logger.info(f'unspent: {unspent}')
-        df = pd.DataFrame.from_dict({
-            'box_id': list(unspent.keys()), 
-            'height': [n['height'] for n in unspent.values()], # list(map(int, unspent.values())), # 'nergs': list(map(int, [v[0] for v in unspent.values()])), 
-            'nerg': [n['nergs'] for n in unspent.values()],
-            'is_unspent': [n['height']!=-1 for n in unspent.values()], # [b!=-1 for b in list(unspent.values())]
-        })
-        df.to_sql(f'{BOXES}', eng, schema='checkpoint', if_exists='replace')
-        if VERBOSE: logger.debug(f'checkpoint.boxes: {height}')
+        if VERBOSE: logger.info(f'unspent: {len(unspent)} boxes')
 
         # execute as transaction
         with eng.begin() as con:
-            # remove spent
-            sql = f'''
-                with spent as (
-                    select box_id
-                    from checkpoint.{BOXES}
-                    where is_unspent::boolean = false
-                )
-                delete from {BOXES} t
-                using spent s
-                where s.box_id = t.box_id
-            '''
-            if VERBOSE: logger.debug(sql)
-            con.execute(sql)
-            if VERBOSE: logger.debug(f'remove spent')
+            if DELTA_APPLY:
+                # spent box_ids and new unspent boxes as arrays, one round-trip; relies on unique index on box_id
+                spent = []
+                created = []
+                for box_id, box_height, nergs in unspent.rows():
+                    if box_height == -1: spent.append(box_id)
+                    else: created.append((box_id, box_height, nergs))
+                # removed boxes are journaled in boxes_spent, so the utxo plugin only deletes what was spent
+                sql = text(f'''
+                    with spent as (
+                        delete from {BOXES} t
+                        using unnest(cast(:spent as varchar[])) s(box_id)
+                        where s.box_id = t.box_id
+                        returning t.box_id
+                    )
+                    , journal as (
+                        insert into boxes_spent (box_id, height)
+                            select box_id, :height from spent
+                        on conflict (box_id) do nothing
+                    )
+                    insert into {BOXES} (box_id, height, is_unspent, nerg)
+                        select box_id, height, true, nerg
+                        from unnest(cast(:box_ids as varchar[]), cast(:heights as int[]), cast(:nergs as bigint[])) c(box_id, height, nerg)
+                    on conflict (box_id) do nothing
+                ''')
+                if VERBOSE: logger.debug(sql)
+                con.execute(sql, {
+                    'height': height,
+                    'spent': spent,
+                    'box_ids': [c[0] for c in created],
+                    'heights': [c[1] for c in created],
+                    'nergs': [c[2] for c in created],
+                })
+                if VERBOSE: logger.debug(f'delta apply: {len(spent)} spent, {len(created)} unspent')
 
-            # add unspent
-            sql = f'''
-                insert into {BOXES} (box_id, height, is_unspent, nerg)
-                    select c.box_id, c.height, c.is_unspent, c.nerg
-                    from checkpoint.{BOXES} c
-                        left join {BOXES} b on b.box_id = c.box_id
-                    where c.is_unspent::boolean = true
-                        and b.box_id is null
-                    ;
-            '''
-            if VERBOSE: logger.debug(sql)
-            con.execute(sql)
-            if VERBOSE: logger.debug(f'add unspent')
+            else:
+                # stage window; height -1 indicates spent
+                copy_rows(con, BOXES, ['box_id', 'height', 'nerg', 'is_unspent'], (
+                    (box_id, box_height, nergs, box_height!=-1) for box_id, box_height, nergs in unspent.rows()
+                ), schema='boxes')
+                if VERBOSE: logger.debug(f'checkpoint.boxes: {height}')
+
+                # remove spent; journal removed boxes for the utxo plugin (alt tables are reconciled in full)
+                journal = f'''
+                    insert into boxes_spent (box_id, height)
+                        select box_id, {int(height)} from removed
+                    on conflict (box_id) do nothing
+                ''' if BOXES == 'boxes' else 'select 1'
+                sql = f'''
+                    with spent as (
+                        select box_id
+                        from checkpoint.{BOXES}
+                        where is_unspent::boolean = false
+                    )
+                    , removed as (
+                        delete from {BOXES} t
+                        using spent s
+                        where s.box_id = t.box_id
+                        returning t.box_id
+                    )
+                    {journal}
+                '''
+                if VERBOSE: logger.debug(sql)
+                con.execute(sql)
+                if VERBOSE: logger.debug(f'remove spent')
+
+                # add unspent
+                sql = f'''
+                    insert into {BOXES} (box_id, height, is_unspent, nerg)
+                        select c.box_id, c.height, c.is_unspent, c.nerg
+                        from checkpoint.{BOXES} c
+                            left join {BOXES} b on b.box_id = c.box_id
+                        where c.is_unspent::boolean = true
+                            and b.box_id is null
+                        ;
+                '''
+                if VERBOSE: logger.debug(sql)
+                con.execute(sql)
+                if VERBOSE: logger.debug(f'add unspent')
+
+        # utxos for new unspent boxes, straight from block outputs; utxo plugin only fetches what is missing
+        if utxos:
+            if VERBOSE: logger.debug(f'checkpoint utxos: {len(utxos)}')
+            await utxo.checkpoint(utxos)
 
         # tokens
         if tokens == {}:
@@ -133,39 +194,20 @@ async def checkpoint(height: int, unspent: dict, tokens: dict) -> None:
                 if VERBOSE: logger.debug(f'checkpoint tokens')
                 resToken = await token.checkpoint(height, tokens, is_plugin=True, args=args)
 
+        # cached api responses are stale
+        with eng.begin() as con:
+            bump_data_version(con)
+
         if VERBOSE: logger.debug(f'checkpoint complete.')
 
     except Exception as e:
         logger.error(f'ERR: checkpointing {e}')
         pass        
 
-# performant API call
-async def get_all(urls) -> dict:
-    retries = 1
-    res = {}
-
-    # try until successful; missing a valid response will invalidate the database
-    while retries > 0:
-        # loop 3 times, then pause
-        while res == {} and (retries%3 > 0):
-            try:
-                res = await get_json_ordered(urls, HEADERS)
-                retries = 0
-
-            # try, try again
-            except Exception as e:
-                retries += 1
-                res = {}
-                logger.warning(f'retry: {retries} ({e})')
-
-        # take a beat
-        if retries > 0:
-            logger.warning(f'WARN: {retries} retries; sleeping for 20s.')
-            sleep(20)
-            retries = 1
-            res = {}
-    
-    return res
+# performant API call; only failed requests are retried, successful results are kept
+async def get_all(urls) -> list:
+    # missing a valid response will invalidate the database; failed requests are retried, and raise if the node keeps failing
+    return await get_json_ordered_retry(urls, HEADERS)
 
 # find the current block height
 async def get_height(args, height: int=-1) -> int:
@@ -203,13 +245,221 @@ async def get_height(args, height: int=-1) -> int:
     logger.info(f'''No height information, starting at genesis block...''')
     return 0
 
-# handle primary functions: scan blocks sequentially; boxes, tokens, plugins
+# download headers, then transactions, one request per block
+async def fetch_blocks_each(batch_order) -> list:
+    urls = [[blk, f'{NODE_API}/blocks/at/{blk}'] for blk in batch_order]
+    block_headers = await get_all(urls)
+    urls = [[hdr[1], f'''{NODE_API}/blocks/{hdr[2][0]}/transactions'''] for hdr in block_headers if hdr[1] != 0]
+    return await get_all(urls)
+
+# download headers for the range in one request, then block bodies BLOCK_BATCH at a time
+async def fetch_blocks_ranged(batch_order) -> list:
+    global RANGE_FETCH
+    status, _, headers = await FETCHER.get_json_ordered([0, f'{NODE_API}/blocks/chainSlice?fromHeight={batch_order[0]}&toHeight={batch_order[-1]}'])
+    if status in (400, 404, 405):
+        RANGE_FETCH = False
+        raise ValueError(f'chainSlice not supported by node (status {status}); fetching one block per request from now on')
+    if status != 200:
+        raise ValueError(f'chainSlice status {status}')
+    header_ids = [hdr['id'] for hdr in headers if batch_order[0] <= hdr['height'] <= batch_order[-1]]
+
+    batches = [[i, f'{NODE_API}/blocks/headerIds'] for i in range(0, len(header_ids), BLOCK_BATCH)]
+    res = await asyncio.gather(*[FETCHER.get_json_ordered(url, timeout=BLOCK_BATCH_TIMEOUT, body=header_ids[url[0]:url[0]+BLOCK_BATCH]) for url in batches])
+    blocks = []
+    for status, i, full_blocks in res:
+        if status != 200:
+            raise ValueError(f'headerIds status {status} (batch at {i})')
+        blocks += [[status, blk['header']['height'], blk['blockTransactions']] for blk in full_blocks]
+
+    # anything the node did not return (slice limits, reorg between calls) is fetched per block
+    found = set(blk[1] for blk in blocks)
+    missing = [blk for blk in batch_order if blk not in found and blk != 0]
+    if len(missing) > 0:
+        if VERBOSE: logger.debug(f'range fetch missing {len(missing)} blocks; fetching individually')
+        blocks += await fetch_blocks_each(missing)
+
+    return blocks
+
+# download transactions for a range of blocks; same shape either way ([status, height, {'transactions': [...]}])
+async def fetch_blocks(batch_order) -> list:
+    if RANGE_FETCH:
+        try:
+            return await fetch_blocks_ranged(batch_order)
+        except Exception as e:
+            logger.warning(f'range fetch failed, fetching one block per request: {e}')
+    return await fetch_blocks_each(batch_order)
+
+# apply fetched blocks, in height order, to working sets; utxo rows are kept for boxes still unspent (when utxos is given)
+async def apply_blocks(blocks: list, unspent: BoxSet, tokens: dict, args=None, utxos: dict=None) -> tuple:
+    for blk, transactions in sorted([[b[1], b[2]] for b in blocks]):
+        for tx in transactions['transactions']:
+            unspent = await del_inputs(tx['inputs'], unspent, utxos=utxos)
+            unspent = await add_outputs(tx['outputs'], unspent, blk, utxos=utxos)
+        if PLUGINS.token:
+            tokens = await token.process(transactions['transactions'], tokens, blk, is_plugin=True, args=args)
+        # yield to the event loop so fetch stage requests keep moving
+        await asyncio.sleep(0)
+    return unspent, tokens, utxos
+
+# fetch stage: download headers, then transactions, for each window
+async def fetch_windows(t, last_height: int, current_height: int, fetched: asyncio.Queue, sizer: WindowSizer) -> None:
+    while last_height < current_height:
+        window_size = sizer.size
+        next_height = last_height+window_size
+        if next_height > current_height:
+            next_height = current_height
+        batch_order = range(last_height, next_height+1)
+
+        # find block headers, then transactions
+        suffix = f'''BLOCKS: {last_height}-{next_height} / {current_height}'''
+        if PRETTYPRINT: printProgressBar(last_height, current_height, prefix=t.split(), suffix=f'{suffix}{" "*(LINELEN-len(suffix))}', length=50)
+        else: 
+            try: percent_complete = f'{100*last_height/current_height:0.2f}%'
+            except: percent_complete= 0
+            logger.info(f'{percent_complete}/{t.split()} {suffix}')
+        beg = perf_counter()
+        blocks = await fetch_blocks(batch_order)
+        sizer.fetched(len(batch_order), perf_counter()-beg)
+
+        # hand off to apply stage; blocks here when apply stage is PIPELINE_DEPTH windows behind
+        await fetched.put((last_height, next_height, blocks))
+        last_height += window_size
+
+    await fetched.put(None)
+
+# apply stage: recreate blockchain (must put together in order)
+async def apply_windows(t, current_height: int, fetched: asyncio.Queue, applied: asyncio.Queue, unspent: BoxSet, sizer: WindowSizer, args=None) -> None:
+    tokens = {}
+    utxos = {} if PLUGINS.utxo else None # held with the utxo cache until flushed
+    cache = UtxoCache(max_boxes=UTXO_CACHE) if UTXO_CACHE > 0 else None
+    windows = 0
+    while True:
+        window = await fetched.get()
+        if window is None:
+            break
+        last_height, next_height, blocks = window
+
+        suffix = f'''UNSPENT: {last_height}-{next_height} / {current_height}'''
+        if PRETTYPRINT: printProgressBar(int(last_height+(2*(next_height-last_height)/3)), current_height, prefix=t.split(), suffix=f'{suffix}{" "*(LINELEN-len(suffix))}', length=50)
+        else: 
+            try: percent_complete = f'{100*int(last_height+(2*(next_height-last_height)/3))/current_height:0.2f}%'
+            except: percent_complete= 0
+            logger.info(f'{percent_complete}/{t.split()} {suffix}')
+        unspent, tokens, utxos = await apply_blocks(blocks, unspent, tokens, args, utxos)
+        sizer.applied(len(blocks), sum(len(b[2]['transactions']) for b in blocks), len(unspent))
+
+        # boxes created and spent while cached never reach postgres; flush every UTXO_FLUSH windows and once caught up
+        # utxo rows are held in memory only (no spill), so flush early once they reach the cache size
+        if cache is not None:
+            cache.apply(unspent, last_height)
+            windows += 1
+            if windows >= UTXO_FLUSH or next_height >= current_height or (utxos is not None and len(utxos) >= UTXO_CACHE):
+                unspent = cache.drain()
+                windows = 0
+            else:
+                # tokens still go out every window; utxo rows wait for their boxes
+                if VERBOSE: logger.debug(f'utxo cache: holding {len(cache)} boxes')
+                await applied.put((next_height, BoxSet(), tokens, None))
+                unspent = BoxSet()
+                tokens = {}
+                continue
+
+        # hand off to write stage; each window gets a fresh working set
+        await applied.put((next_height, unspent, tokens, utxos))
+        unspent = BoxSet()
+        tokens = {}
+        utxos = {} if PLUGINS.utxo else None
+
+    if cache is not None:
+        cache.close()
+    await applied.put(None)
+
+# write stage: checkpoint each window to postgres, in order
+async def write_windows(t, last_height: int, current_height: int, applied: asyncio.Queue, sizer: WindowSizer) -> None:
+    while True:
+        window = await applied.get()
+        if window is None:
+            break
+        next_height, unspent, tokens, utxos = window
+
+        if VERBOSE: logger.debug('Checkpointing...')
+        suffix = f'Checkpoint at {next_height} (boxes: {len(unspent)}; tokens: {len(tokens)})...'            
+        if PRETTYPRINT: printProgressBar(next_height, current_height, prefix=t.split(), suffix=f'{suffix}{" "*(LINELEN-len(suffix))}', length=50)
+        else: 
+            try: percent_complete = f'{100*next_height/current_height:0.2f}%'
+            except: percent_complete= 0
+            logger.warning(f'{percent_complete}/{t.split()} {suffix}')
+        if len(unspent) > 0 or len(tokens) > 0:
+            # checkpoint blocks on sqlalchemy; run it in its own thread/loop so fetch and apply stages continue
+            beg = perf_counter()
+            await asyncio.to_thread(asyncio.run, checkpoint(next_height, unspent, tokens, utxos))
+            sizer.written(next_height-last_height, perf_counter()-beg)
+            last_height = next_height
+        elif UTXO_CACHE == 0:
+            logger.error('ERR: 0 boxes found')
+
+# resync worker: fetch and apply one block range in its own process
+def scan_range(last_height: int, next_height: int, args=None) -> tuple:
+    global RANGE_FETCH
+    if args is not None: RANGE_FETCH = not args.eachblock # spawned workers start from module defaults
+
+    async def scan():
+        try:
+            blocks = await fetch_blocks(range(last_height, next_height+1))
+            return await apply_blocks(blocks, BoxSet(), {}, args, {} if PLUGINS.utxo else None)
+        finally:
+            await FETCHER.close()
+
+    unspent, tokens, utxos = asyncio.run(scan())
+    return last_height, next_height, unspent, tokens, utxos
+
+# resync: scan RESYNC_WORKERS ranges of FETCH_INTERVAL blocks in parallel, merge by height, checkpoint; returns height reached
+async def resync(args, t, last_height: int, current_height: int, unspent: BoxSet) -> int:
+    loop = asyncio.get_running_loop()
+    batch = RESYNC_WORKERS*FETCH_INTERVAL
+    writing = None
+    with ProcessPoolExecutor(max_workers=RESYNC_WORKERS, mp_context=multiprocessing.get_context('spawn')) as pool:
+        while current_height-last_height > batch:
+            ranges = [(h, h+FETCH_INTERVAL) for h in range(last_height, last_height+batch, FETCH_INTERVAL)]
+            next_height = ranges[-1][1]
+            suffix = f'''RESYNC: {last_height}-{next_height} / {current_height} ({RESYNC_WORKERS} workers)'''
+            if PRETTYPRINT: printProgressBar(last_height, current_height, prefix=t.split(), suffix=f'{suffix}{" "*(LINELEN-len(suffix))}', length=50)
+            else: 
+                try: percent_complete = f'{100*last_height/current_height:0.2f}%'
+                except: percent_complete= 0
+                logger.info(f'{percent_complete}/{t.split()} {suffix}')
+            results = await asyncio.gather(*[loop.run_in_executor(pool, scan_range, a, b, args) for a, b in ranges])
+
+            # merge in height order; later ranges override (spent boxes), first mint of a token wins
+            tokens = {}
+            utxos = {}
+            for _, _, range_unspent, range_tokens, range_utxos in sorted(results, key=lambda r: r[0]):
+                unspent.update(range_unspent)
+                for token_id, tkn in range_tokens.items():
+                    tokens.setdefault(token_id, tkn)
+                if range_utxos: utxos.update(range_utxos)
+
+            # drop rows for boxes spent in a later range
+            utxos = {box_id: row for box_id, row in utxos.items() if unspent.get(box_id)[0] != -1}
+
+            # write this batch while the next one is scanned
+            if writing is not None:
+                await writing
+            writing = asyncio.create_task(asyncio.to_thread(asyncio.run, checkpoint(next_height, unspent, tokens, utxos)))
+            last_height = next_height
+            unspent = BoxSet()
+
+        if writing is not None:
+            await writing
+
+    return last_height
+
+# handle primary functions: scan blocks as a pipeline (fetch -> apply -> write); boxes, tokens, plugins
 async def process(args, t, height: int=-1) -> dict:
     # find unspent boxes at current height
     node_info = get_node_info()
     current_height = node_info['fullHeight']
-    unspent = {}
-    tokens = {}
+    unspent = BoxSet()
 
     # nothing found, start from beginning
     last_height = await get_height(args, height)
@@ -218,72 +468,32 @@ async def process(args, t, height: int=-1) -> dict:
         genesis_blocks = res.json()
         for gen in genesis_blocks:
             box_id = gen['boxId']
-            unspent[box_id] = {'height': 0, 'nergs': gen['value']} # height 0
+            unspent.add(box_id, 0, gen['value']) # height 0
         last_height = 1
 
     # lets gooooo...
+    stages = []
     try:
         if last_height >= current_height:
             logger.warning('Already caught up...')
 
-        # process blocks until caught up with current height
-        while last_height < current_height:
-            next_height = last_height+FETCH_INTERVAL
-            if next_height > current_height:
-                next_height = current_height
-            batch_order = range(last_height, next_height+1)
-
-            # find block headers
-            suffix = f'''BLOCKS: {last_height}-{next_height} / {current_height}'''
-            if PRETTYPRINT: printProgressBar(last_height, current_height, prefix=t.split(), suffix=f'{suffix}{" "*(LINELEN-len(suffix))}', length=50)
-            else: 
-                try: percent_complete = f'{100*last_height/current_height:0.2f}%'
-                except: percent_complete= 0
-                logger.info(f'{percent_complete}/{t.split()} {suffix}')
-            urls = [[blk, f'{NODE_API}/blocks/at/{blk}'] for blk in batch_order]
-            block_headers = await get_all(urls)
-
-            # find transactions
-            suffix = f'''TRANSACTIONS: {last_height}-{next_height} / {current_height}'''
-            if PRETTYPRINT: printProgressBar(int(last_height+(FETCH_INTERVAL/3)), current_height, prefix=t.split(), suffix=f'{suffix}{" "*(LINELEN-len(suffix))}', length=50)
-            else: 
-                try: percent_complete = f'{100*int(last_height+(2*FETCH_INTERVAL/3))/current_height:0.2f}%'
-                except: percent_complete= 0
-                logger.info(f'{percent_complete}/{t.split()} {suffix}')
-            urls = [[hdr[1], f'''{NODE_API}/blocks/{hdr[2][0]}/transactions'''] for hdr in block_headers if hdr[1] != 0]
-            blocks = await get_all(urls)
+        # far behind; scan ranges in parallel until within one batch of current height
+        if RESYNC_WORKERS > 0 and current_height-last_height > RESYNC_WORKERS*FETCH_INTERVAL:
+            last_height = await resync(args, t, last_height, current_height, unspent)
+            unspent = BoxSet()
 
-            # recreate blockchain (must put together in order)
-            suffix = f'''UNSPENT: {last_height}-{next_height} / {current_height}'''
-            if PRETTYPRINT: printProgressBar(int(last_height+(2*FETCH_INTERVAL/3)), current_height, prefix=t.split(), suffix=f'{suffix}{" "*(LINELEN-len(suffix))}', length=50)
-            else: 
-                try: percent_complete = f'{100*int(last_height+(2*FETCH_INTERVAL/3))/current_height:0.2f}%'
-                except: percent_complete= 0
-                logger.info(f'{percent_complete}/{t.split()} {suffix}')
-            for blk, transactions in sorted([[b[1], b[2]] for b in blocks]):
-                for tx in transactions['transactions']:
-                    unspent = await del_inputs(tx['inputs'], unspent)
-                    unspent = await add_outputs(tx['outputs'], unspent, blk)
-                # TODO: move this to separate process
-                if PLUGINS.token:
-                    tokens = await token.process(transactions['transactions'], tokens, blk, is_plugin=True, args=args)
-
-            # checkpoint
-            if VERBOSE: logger.debug('Checkpointing...')
-            last_height += FETCH_INTERVAL
-            suffix = f'Checkpoint at {next_height} (boxes: {len(unspent)}; tokens: {len(tokens)})...'            
-            if PRETTYPRINT: printProgressBar(next_height, current_height, prefix=t.split(), suffix=f'{suffix}{" "*(LINELEN-len(suffix))}', length=50)
-            else: 
-                try: percent_complete = f'{100*next_height/current_height:0.2f}%'
-                except: percent_complete= 0
-                logger.warning(f'{percent_complete}/{t.split()} {suffix}')
-            if len(unspent) > 0:
-                await checkpoint(next_height, unspent, tokens)
-            else:
-                logger.error('ERR: 0 boxes found')
-                
-            unspent = {}
-            tokens = {}
+        # process blocks until caught up with current height
+        # window N+1 is fetched while window N is applied and window N-1 is written; bounded queues limit memory
+        # window size adapts to measured cost of recent windows
+        sizer = WindowSizer(FETCH_INTERVAL, FETCH_MIN, FETCH_MAX, verbose=VERBOSE)
+        fetched = asyncio.Queue(maxsize=PIPELINE_DEPTH)
+        applied = asyncio.Queue(maxsize=PIPELINE_DEPTH)
+        stages = [
+            asyncio.create_task(fetch_windows(t, last_height, current_height, fetched, sizer)),
+            asyncio.create_task(apply_windows(t, current_height, fetched, applied, unspent, sizer, args)),
+            asyncio.create_task(write_windows(t, last_height, current_height, applied, sizer)),
+        ]
+        await asyncio.gather(*stages)
 
     except KeyboardInterrupt:
         logger.error('Interrupted.')
@@ -293,6 +503,11 @@ async def process(args, t, height: int=-1) -> dict:
     except Exception as e:
         logger.error(f'ERR: {myself()}; {e}')
 
+    finally:
+        # if any stage failed, don't leave the others running
+        for stage in stages:
+            stage.cancel()
+
     return {
         'current_height' : current_height,
         'blips': BLIPS
@@ -339,11 +554,14 @@ class App:
         t.start()
 
         # process
-        res = await process(args, t, height)
+        FETCHER.reset_stats()
+        try: res = await process(args, t, height)
+        finally: await FETCHER.close()
         
         # timer
         sec = t.stop()
         logger.debug(f'main.app:: Danaides process took {sec:0.4f}s...')
+        logger.debug(f'main.app:: node requests {FETCHER.stats()}')
         
         return res['current_height']
 
@@ -427,7 +645,13 @@ def cli():
     global PRETTYPRINT
     global VERBOSE
     global FETCH_INTERVAL
+    global FETCH_MIN
+    global FETCH_MAX
     global BOXES
+    global DELTA_APPLY
+    global UTXO_CACHE
+    global RESYNC_WORKERS
+    global RANGE_FETCH
 
     parser = argparse.ArgumentParser()
     
@@ -436,11 +660,18 @@ def cli():
     parser.add_argument("-H", "--height", help="Begin at this height", type=int, default=-1)
     parser.add_argument("-Z", "--sleep", help="Begin at this height", type=int, default=0)
     parser.add_argument("-F", "--fetchinterval", help="Begin at this height", type=int, default=FETCH_INTERVAL)
+    parser.add_argument("-m", "--fetchmin", help="Smallest window of blocks (set min and max to -F for a fixed window)", type=int, default=FETCH_MIN)
+    parser.add_argument("-M", "--fetchmax", help="Largest window of blocks", type=int, default=FETCH_MAX)
     parser.add_argument("-P", "--prettyprint", help="Progress bar vs. scrolling", action='store_true')
     parser.add_argument("-O", "--once", help="When complete, finish", action='store_true')
     parser.add_argument("-S", "--includespent", help="Also track spent UTXOs", action='store_true')
     parser.add_argument("-X", "--ignoreplugins", help="Only process boxes", action='store_true')
     parser.add_argument("-V", "--verbose", help="Be wordy", action='store_true')
+    parser.add_argument("-D", "--stagedcheckpoint", help="Stage boxes and anti-join instead of delta apply", action='store_true')
+    parser.add_argument("-E", "--eachblock", help="Fetch one block per request instead of node range endpoints", action='store_true')
+    parser.add_argument("-R", "--resync", help="Scan block ranges in this many processes when far behind (0 to scan in order)", type=int, default=RESYNC_WORKERS)
+    parser.add_argument("-W", "--refreshworkers", help="Refresh this many independent matviews at once", type=int, default=REFRESH_WORKERS)
+    parser.add_argument("-U", "--utxocache", help="Hold this many boxes in memory across windows (0 to write every window)", type=int, default=UTXO_CACHE)
     
     args = parser.parse_args()
 
@@ -452,16 +683,41 @@ def cli():
     if args.prettyprint: logger.warning(f'Pretty print...')
     if args.once: logger.warning(f'Processing once, then exit...')
     if args.verbose: logger.warning(f'Verbose...')
-    if args.fetchinterval != 1500: logger.warning(f'Fetch interval: {args.fetchinterval}...')
+    if args.fetchinterval != 1500: logger.warning(f'Fetch interval: {args.fetchinterval} (adapts within {args.fetchmin}-{args.fetchmax})...')
     if args.includespent: logger.warning(f'Storing spent boxes...')
+    if args.stagedcheckpoint: logger.warning(f'Staged checkpoint...')
+    if args.utxocache > 0: logger.warning(f'UTXO cache: {args.utxocache} boxes...')
+    if args.resync > 0: logger.warning(f'Resync workers: {args.resync}...')
+    if args.eachblock: logger.warning(f'Fetching one block per request...')
 
     PRETTYPRINT = args.prettyprint
     VERBOSE = args.verbose
     FETCH_INTERVAL = args.fetchinterval
+    FETCH_MIN = args.fetchmin
+    FETCH_MAX = args.fetchmax
     BOXES = ''.join([i for i in args.juxtapose if i.isalpha()]) # only-alpha tablename
+    DELTA_APPLY = not args.stagedcheckpoint and BOXES == 'boxes' # alt tables may not have unique box_id
+    UTXO_CACHE = args.utxocache
+    RESYNC_WORKERS = args.resync
+    RANGE_FETCH = not args.eachblock
 
     return args
 
+# refresh one matview through the api (which may hand it to celery); returns once done, False when it failed (retried next refresh)
+def refresh_matview(tbl: str) -> bool:
+    logger.debug(f'refreshing matview {tbl}')
+    try:
+        res = requests.get(f'http://danaides-api:7000/api/tasks/refresh/{tbl.lower()}/')
+        if res.ok:
+            logger.info(f'''main:: refresh {tbl.upper()} complete''')
+            return True
+        logger.error(f'main:: error requesting refresh for table, {tbl.upper()}...')
+
+    except Exception as e:
+        logger.error(f'main:: error requesting refresh for table, {tbl.upper()}; {e}')
+
+    return False
+
 def ping_danaides_api():
     i:int = 0
     while i >= 0:
@@ -504,6 +760,10 @@ if __name__ == '__main__':
     # create app
     app = App()
     app.init()
+
+    # matviews refreshed after each block, when their inputs changed; with INCREMENTAL_VIEWS, some are tables kept current by delta instead
+    views = [v for v in REFRESH_VIEWS if not (INCREMENTAL_VIEWS and v in INCREMENTAL_TABLES)]
+    refresher = RefreshScheduler(views, refresh_matview, workers=args.refreshworkers)
     
     # process loop
     height = args.height # first time
@@ -533,17 +793,13 @@ if __name__ == '__main__':
                 logger.warning('main:: PLUGIN: Prices...')
                 asyncio.run(prices.process(is_plugin=True, args=args))
 
-            # rebuild intermediate views
+            # rebuild intermediate views; only those whose inputs changed, dependencies first
             ping_danaides_api()
-            for tbl in ['staking', 'vesting', 'assets', 'balances', 'tokenomics_ergopad', 'tokenomics_paideia', 'unspent_by_token', 'token_status', 'token_free', 'token_staked', 'token_locked']:
-                logger.debug(f'refreshing matview {tbl}')
-                res = requests.get(f'http://danaides-api:7000/api/tasks/refresh/{tbl.lower()}/')
-                if res.ok:
-                    logger.info(f'''main:: refresh {tbl.upper()} complete''')
-                    # logger.info(f'''main:: processing table {tbl.upper()}, uid: {res.json()['uid']}''')
-                else:
-                    logger.error(f'main:: error requesting refresh for table, {tbl.upper()}...')
-                # logger.debug(f'''main:: {tbl.upper()} compete ({res['row_count_before']}/{res['row_count_after']} before/after rows)''')
+            if INCREMENTAL_VIEWS:
+                incremental.apply(CHANGES)
+            refresher.refresh()
+            with eng.begin() as con:
+                bump_data_version(con)
 
             # rebuild indexes after drop'n'pop
             # logger.debug(f'''main:: build indexes''')
@@ -2,8 +2,9 @@ import asyncio
 import argparse
 
 from utils.logger import logger, Timer
-from utils.db import eng
+from utils.db import eng, bump_data_version
 from utils.ergodex import getErgodexPoolBox, parseValidPools
+from utils.refresh import CHANGES
 
 #region INIT
 PRETTYPRINT = False
@@ -82,6 +83,8 @@ async def process(is_plugin=False, args=None) -> int:
                             '''
                         if VERBOSE: logger.warning(sql)
                         con.execute(sql)                        
+                        bump_data_version(con)
+                    CHANGES.token(token_id)
 
             except Exception as e:
                 logger.error(f'ERR: {e}')
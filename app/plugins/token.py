@@ -1,9 +1,10 @@
 import asyncio
-import pandas as pd
 import argparse
 
-from utils.db import eng, text
+from utils.db import eng, text, copy_rows
 from utils.logger import logger, myself, Timer, printProgressBar, LEIF
+from utils.ergo import decode_register, RegisterType
+from utils.refresh import CHANGES
 from ergo_python_appkit.appkit import ErgoAppKit, ErgoValue
 
 #region INIT
@@ -13,6 +14,16 @@ NERGS2ERGS = 10**9
 BOXES = 'boxes'
 TOKENS = 'tokens'
 
+# one minted token; working set for a window is token_id -> Token
+class Token:
+    __slots__ = ('height', 'token_name', 'decimals', 'amount')
+
+    def __init__(self, height: int, token_name: str, decimals: int, amount: int):
+        self.height = height
+        self.token_name = token_name
+        self.decimals = decimals
+        self.amount = amount
+
 # upsert current chunk
 async def checkpoint(height, tokens, is_plugin: bool=False, args=None):
     try:
@@ -24,19 +35,14 @@ async def checkpoint(height, tokens, is_plugin: bool=False, args=None):
         # if PRETTYPRINT: printProgressBar(height, height, prefix='[TOKENS]', suffix=suffix, length=50)
         # else: logger.info(suffix)
         if VERBOSE: logger.debug(tokens)
-        df = pd.DataFrame.from_dict({
-            'token_id': list(tokens.keys()), 
-            'height': [n['height'] for n in tokens.values()], 
-            'amount': [n['amount'] for n in tokens.values()],
-            'token_name': [n['token_name'] for n in tokens.values()],
-            'decimals': [n['decimals'] for n in tokens.values()], 
-        })
-        if VERBOSE: logger.warning(df)
-        df.to_sql(f'{TOKENS}', eng, schema='checkpoint', if_exists='replace')
-        if VERBOSE: logger.debug('saved to checkpoint.tokens')
 
         # execute as transaction
         with eng.begin() as con:
+            copy_rows(con, TOKENS, ['token_id', 'height', 'amount', 'token_name', 'decimals'], (
+                (token_id, n.height, n.amount, n.token_name, n.decimals) for token_id, n in tokens.items()
+            ), schema='tokens')
+            if VERBOSE: logger.debug('saved to checkpoint.tokens')
+
             # add unspent
             sql = f'''
                 insert into {TOKENS} (token_id, height, amount, token_name, decimals)
@@ -57,6 +63,10 @@ async def checkpoint(height, tokens, is_plugin: bool=False, args=None):
             if VERBOSE: logger.debug(sql)
             con.execute(sql)
 
+        # for the matview refresh scheduler
+        for token_id in tokens:
+            CHANGES.token(token_id)
+
     except Exception as e:
         logger.error(f'ERR: checkpointing {e}')
         pass  
@@ -80,11 +90,19 @@ async def process(transactions: dict, tokens: dict, height: int, is_plugin: bool
                             
                             # if already exists, don't redo work
                             if token_id not in new:
-                                try: token_name = ''.join([chr(r) for r in ErgoAppKit.deserializeLongArray(o['additionalRegisters']['R4'])])
-                                except: token_name = ''
+                                # decode common shapes locally; appkit only for anything else
+                                kind, value = decode_register(o['additionalRegisters'].get('R4', ''))
+                                if kind == RegisterType.CollByte: token_name = value.decode('utf-8', errors='replace')
+                                else:
+                                    try: token_name = ''.join([chr(r) for r in ErgoAppKit.deserializeLongArray(o['additionalRegisters']['R4'])])
+                                    except: token_name = ''
                                 if 'R6' in o['additionalRegisters']:
-                                    try: decimals = ''.join([chr(r) for r in ErgoAppKit.deserializeLongArray(o['additionalRegisters']['R6'])])
-                                    except: decimals = ErgoValue.fromHex(o['additionalRegisters']['R6']).getValue()
+                                    kind, value = decode_register(o['additionalRegisters']['R6'])
+                                    if kind == RegisterType.CollByte: decimals = value.decode('utf-8', errors='replace') # i.e. '6'
+                                    elif kind in (RegisterType.Int, RegisterType.Long): decimals = value
+                                    else:
+                                        try: decimals = ''.join([chr(r) for r in ErgoAppKit.deserializeLongArray(o['additionalRegisters']['R6'])])
+                                        except: decimals = ErgoValue.fromHex(o['additionalRegisters']['R6']).getValue()
                                 else:
                                     decimals = 0
                                 try: decimals = int(decimals)
@@ -94,12 +112,7 @@ async def process(transactions: dict, tokens: dict, height: int, is_plugin: bool
                                 # some funky deserialization issues
                                 if type(amount) == int:
                                     if VERBOSE: logger.debug(f'''token found: {token_name}/{decimals}/{token_id}/{amount}''')
-                                    new[token_id] = {
-                                        'height': height,
-                                        'token_name': token_name,
-                                        'decimals': decimals,
-                                        'amount': amount
-                                    }
+                                    new[token_id] = Token(height, token_name, decimals, amount)
                     except Exception as e:
                         # BLIPS.append({'asset': a, 'height': height, 'msg': f'invalid asset while looking for tokens'})
                         logger.warning(f'invalid asset, {a} at height {height} while fetching tokens {e}')
@@ -1,14 +1,12 @@
 import asyncio
-import pandas as pd
 import argparse
-import json
 
 from time import sleep 
 from utils.logger import logger, Timer, printProgressBar
-from utils.db import eng, text
-from utils.ergo import headers, NODE_API
-from utils.aioreq import get_json_ordered
-from requests import get
+from utils.db import eng, text, copy_rows
+from utils.ergo import headers, NODE_API, raw_to_address, decode_register, RegisterType
+from utils.aioreq import get_json_ordered, FETCHER
+from utils.refresh import CHANGES
 from ergo_python_appkit.appkit import ErgoValue
 
 #region INIT
@@ -18,66 +16,196 @@ VERBOSE = False
 NERGS2ERGS = 10**9
 UPDATE_INTERVAL = 100 # update progress display every X blocks
 CHECKPOINT_INTERVAL = 5000 # save progress every X blocks
-CLEANUP_NEEDED = False
+CLEANUP_NEEDED = True # full anti-join against boxes on first run; then only boxes journaled in boxes_spent
 #endregion INIT
 
 #region FUNCTIONS
 
+# typed columns for each register decode_register understands: (register, type, token_id, coll_byte, long, coll_long)
+def register_values(registers: dict) -> list:
+    values = []
+    for register, serialized in registers.items():
+        kind, value = decode_register(serialized)
+        if kind == RegisterType.CollByte:
+            values.append((register, kind, value.hex() if len(value) == 32 else None, value.hex(), None, None))
+        elif kind in (RegisterType.Int, RegisterType.Long):
+            values.append((register, kind, None, None, value, None))
+        elif kind == RegisterType.CollLong:
+            values.append((register, kind, None, None, None, '{'+','.join([str(v) for v in value])+'}'))
+    return values
+
+# keep address_balances/address_tokens current for boxes in CTE {boxes} (address, nergs, assets), added (sign '') or removed (sign '-')
+def address_totals(boxes: str, sign: str='') -> str:
+    return f'''
+        , _address_balances as (
+            insert into address_balances (address, nergs, boxes)
+                select address, {sign}sum(nergs), {sign}count(*)
+                from {boxes}
+                where address != ''
+                group by address
+            on conflict (address) do update
+                set nergs = address_balances.nergs + excluded.nergs
+                    , boxes = address_balances.boxes + excluded.boxes
+        )
+        , _address_tokens as (
+            insert into address_tokens (address, token_id, amount)
+                select b.address, a.key, {sign}sum(a.value::bigint)
+                from {boxes} b, each(b.assets) a
+                where b.address != ''
+                group by b.address, a.key
+            on conflict (address, token_id) do update
+                set amount = address_tokens.amount + excluded.amount
+        )
+    '''
+
+# after removing boxes, drop totals that are now empty
+def prune_address_totals(con, addresses: list):
+    if len(addresses) > 0:
+        con.execute(text(f'''delete from address_balances where address = any(:addresses) and boxes <= 0'''), {'addresses': addresses})
+        con.execute(text(f'''delete from address_tokens where address = any(:addresses) and amount <= 0'''), {'addresses': addresses})
+
+# rebuild address totals from utxos (i.e. after a full cleanup pass)
+def recompute_address_totals(con):
+    con.execute(f'''truncate address_balances, address_tokens''')
+    con.execute(f'''
+        insert into address_balances (address, nergs, boxes)
+            select address, sum(nergs), count(*)
+            from utxos
+            where address != ''
+            group by address
+    ''')
+    con.execute(f'''
+        insert into address_tokens (address, token_id, amount)
+            select address, token_id, sum(amount)
+            from utxo_assets
+            where address != ''
+            group by address, token_id
+    ''')
+
+# utxo row for a box, from a transaction output (block transactions or /utxo/byId); see checkpoint
+def utxo_row(output: dict, height: int) -> dict:
+    ergo_tree = output['ergoTree']
+    return {
+        'box_id': output['boxId'],
+        'ergo_tree': ergo_tree,
+        'address': ergo_tree[6:] if ergo_tree[:6] == '0008cd' else '', # only worry about addresses for wallets
+        'nergs': output['value'],
+        'registers': ','.join([f'''{i}=>{j}''' for i, j in output['additionalRegisters'].items()]),
+        'register_values': register_values(output['additionalRegisters']),
+        'assets': ','.join([f'''{a['tokenId']}=>{a['amount']}''' for a in output['assets']]),
+        'transaction_id': output['transactionId'],
+        'index': output['index'],
+        'creation_height': output['creationHeight'],
+        'height': height,
+    }
+
 async def checkpoint(utxos):
     try:
-        addr_converter = {}
-
-        # utxos
-        contents = {'box_id': [], 'ergo_tree': [], 'address': [], 'nergs': [], 'registers': [], 'assets': [], 'transaction_id': [], 'box_index': [], 'creation_height': [], 'height': []}
+        # utxos; address encoded locally (only wallets, P2PK, have address)
+        rows = []
+        register_rows = []
         for box_id, content in utxos.items():
-            contents['box_id'].append(box_id)
-            contents['ergo_tree'].append(content['ergo_tree'])
-            if content['address'] not in addr_converter:
-                r2a = get(f'''{NODE_API}/utils/rawToAddress/{content['address']}''', headers=headers, timeout=2)
-                if r2a.ok:
-                    pubkey = r2a.json()['address']
-                    addr_converter[content['address']] = pubkey
-                else: 
-                    addr_converter[content['address']] = ''
-            contents['address'].append(addr_converter[content['address']])
-            contents['nergs'].append(content['nergs'])
-            contents['registers'].append(json.dumps(content['registers']))
-            contents['assets'].append(json.dumps(content['assets']))
-            contents['transaction_id'].append(json.dumps(content['transaction_id']))
-            contents['box_index'].append(json.dumps(content['index']))
-            contents['creation_height'].append(json.dumps(content['creation_height']))
-            contents['height'].append(content['height'])
-        df_box_contents = pd.DataFrame().from_dict(contents)
-        df_box_contents.to_sql(f'utxos', eng, schema='checkpoint', if_exists='replace') # , dtype={"new_json_col": sqlalchemy.types.JSON},
+            rows.append((
+                box_id, 
+                content['ergo_tree'], 
+                raw_to_address(content['address']) if content['address'] != '' else '', 
+                content['nergs'], 
+                content['registers'], 
+                content['assets'], 
+                content['transaction_id'], 
+                content['index'], 
+                content['creation_height'], 
+                content['height'],
+            ))
+            register_rows += [(box_id,)+r for r in content.get('register_values', [])]
 
         # utxos
         with eng.begin() as con:
+            copy_rows(con, 'utxos', ['box_id', 'ergo_tree', 'address', 'nergs', 'registers', 'assets', 'transaction_id', 'box_index', 'creation_height', 'height'], rows)
+
+            # through the partitioned parent; postgres routes each row to its partition; address totals from the boxes actually inserted
+            sql = f'''
+                with inserted as (
+                    insert into utxos (box_id, ergo_tree, address, nergs, registers, assets, transaction_id, index, creation_height, height, assets_array)
+                        select 
+                            box_id
+                            , ergo_tree
+                            , address
+                            , nergs
+                            , registers::hstore as registers
+                            , assets::hstore as assets
+                            , transaction_id
+                            , box_index as index
+                            , creation_height
+                            , height
+                            , ('{{'||assets||'}}')::hstore[] as assets_array
+                        from checkpoint.utxos
+                    on conflict (box_id) do nothing
+                    returning address, nergs, assets
+                )
+                {address_totals('inserted')}
+                select count(*) as i from inserted
+                '''
+            con.execute(sql)
+
+            # utxo_assets; one row per token, so holder/balance queries are index lookups instead of each(assets)
             sql = f'''
-                insert into utxos (box_id, ergo_tree, address, nergs, registers, assets, transaction_id, index, creation_height, height, assets_array)
-                    select 
-                        box_id::varchar(64)
-                        , ergo_tree::text
-                        , address::varchar(64)
-                        , nergs::bigint
-                        , trim(both '"' from registers::text)::hstore as registers
-                        , trim(both '"' from assets::text)::hstore as assets
-                        , trim(both '"' from transaction_id::text)::varchar(64) as transaction_id
-                        , box_index::int as index
-                        , creation_height::int
-                        , height::int
-                        , ('{{'||trim(both '"' from assets::text)||'}}')::hstore[] as assets_array
-                    from checkpoint.utxos
-            '''
+                insert into utxo_assets (box_id, address, token_id, amount)
+                    select c.box_id, c.address, a.key, a.value::bigint
+                    from checkpoint.utxos c, each(c.assets::hstore) a
+                on conflict (box_id, token_id) do nothing
+                '''
             con.execute(sql)
 
+            # utxo_registers; registers decoded once here, so views and filters use typed columns instead of parsing hex
+            copy_rows(con, 'utxo_registers', ['box_id', 'register', 'type', 'token_id', 'coll_byte', 'long', 'coll_long'], register_rows)
+            sql = f'''
+                insert into utxo_registers (box_id, register, type, token_id, coll_byte, long, coll_long)
+                    select box_id, register, type, token_id, coll_byte, long, coll_long::bigint[]
+                    from checkpoint.utxo_registers
+                on conflict (box_id, register) do nothing
+                '''
+            con.execute(sql)
+
+        # for the matview refresh scheduler
+        for row in rows:
+            CHANGES.box(row[0], row[1], row[2], [a.split('=>')[0] for a in row[5].split(',') if a != ''])
+
     except Exception as e:
         logger.debug(f'ERR: checkpoint {e}')
         pass
 
 async def prepare_destination(boxes_tablename:str):
+    global CLEANUP_NEEDED
     logger.info('Remove spent boxes from utxos tables...')
 
     try:    
+        # scanner journals boxes it removes; cost is proportional to spends since last run
+        if boxes_tablename == 'boxes' and not CLEANUP_NEEDED:
+            with eng.begin() as con:
+                sql = text(f'''
+                    with spent as (
+                        delete from boxes_spent
+                        returning box_id
+                    )
+                    , deleted as (
+                        delete from utxos t
+                        using spent s
+                        where s.box_id = t.box_id
+                        returning t.box_id, t.ergo_tree, t.address, t.nergs, t.assets
+                    )
+                    {address_totals('deleted', '-')}
+                    select box_id, ergo_tree, address, akeys(assets) as tokens
+                    from deleted
+                ''')
+                if VERBOSE: logger.debug(sql)
+                addresses = set()
+                for r in con.execute(sql).fetchall():
+                    CHANGES.box(r['box_id'], r['ergo_tree'], r['address'], r['tokens'] or [])
+                    if r['address'] != '': addresses.add(r['address'])
+                prune_address_totals(con, list(addresses))
+            return
+
         with eng.begin() as con:
             # remove unspent boxes from utxos
             sql = text(f'''
@@ -94,33 +222,84 @@ async def prepare_destination(boxes_tablename:str):
             ''')
             if VERBOSE: logger.debug(sql)
             con.execute(sql)
+            CHANGES.all()
+            recompute_address_totals(con)
+
+            # everything journaled so far is covered by the full pass
+            if boxes_tablename == 'boxes':
+                con.execute('truncate boxes_spent')
+                CLEANUP_NEEDED = False
 
     except Exception as e:
         logger.error(f'ERR: Preparing utxo table {e}')
         pass
     
-async def get_all_unspent_boxes(boxes_tablename:str, box_override:str):
-    # determine next height to start at
+# last committed (height, box_id) for an unfinished run; ('-1', '') to start from the beginning
+async def get_progress(boxes_tablename:str) -> tuple:
     try:
-        logger.info('Finding boxes...')
-        sql = text(f'''
-            select b.box_id, b.height
-            from {boxes_tablename} b
-                left join utxos u on u.box_id = b.box_id
-            where u.index is null
-        ''')
-        # find boxes from checkpoint or standard sql query
-        if VERBOSE: logger.debug(sql)
+        sql = text(f'''select height, box_id from utxos_progress where boxes_table = :boxes_tablename''')
         with eng.begin() as con:
-            # TODO: implement box_override
-            boxes = con.execute(sql, {'box_override': box_override}).fetchall()
+            res = con.execute(sql, {'boxes_tablename': boxes_tablename}).fetchone()
+        if res is not None:
+            logger.info(f'''Resuming after box {res['box_id']} at height {res['height']}...''')
+            return res['height'], res['box_id']
+
+    except Exception as e:
+        logger.error(f'ERR: Fetching utxo progress {e}')
+        pass
 
-        return boxes
+    return -1, ''
+
+# record last committed box; cleared (None) once all boxes are processed
+async def save_progress(boxes_tablename:str, last_box:tuple=None):
+    try:
+        with eng.begin() as con:
+            if last_box is None:
+                sql = text(f'''delete from utxos_progress where boxes_table = :boxes_tablename''')
+                con.execute(sql, {'boxes_tablename': boxes_tablename})
+            else:
+                sql = text(f'''
+                    insert into utxos_progress (boxes_table, height, box_id, updated_at)
+                    values (:boxes_tablename, :height, :box_id, now())
+                    on conflict (boxes_table) do update
+                        set height = excluded.height, box_id = excluded.box_id, updated_at = excluded.updated_at
+                ''')
+                con.execute(sql, {'boxes_tablename': boxes_tablename, 'height': last_box[0], 'box_id': last_box[1]})
 
     except Exception as e:
-        logger.error(f'ERR: Fetching all unspent boxes {e}')
+        logger.error(f'ERR: Saving utxo progress {e}')
         pass
 
+# boxes missing from utxos, CHECKPOINT_INTERVAL at a time, keyset paged by (height, box_id) from after last_box
+async def get_all_unspent_boxes(boxes_tablename:str, box_override:str, last_box:tuple=(-1, '')):
+    logger.info('Finding boxes...')
+    height, box_id = last_box
+    sql = text(f'''
+        select b.box_id, b.height
+        from {boxes_tablename} b
+            left join utxos u on u.box_id = b.box_id
+        where u.index is null
+            and (b.height, b.box_id) > (:height, :box_id)
+        order by b.height, b.box_id
+        limit {CHECKPOINT_INTERVAL}
+    ''')
+    if VERBOSE: logger.debug(sql)
+    while True:
+        try:
+            with eng.begin() as con:
+                # TODO: implement box_override
+                boxes = con.execute(sql, {'height': height, 'box_id': box_id}).fetchall()
+
+        except Exception as e:
+            # raise, so the run stops without clearing progress
+            logger.error(f'ERR: Fetching all unspent boxes {e}')
+            raise
+
+        if len(boxes) == 0:
+            return
+        yield boxes
+        height, box_id = boxes[-1]['height'], boxes[-1]['box_id']
+
 async def process(is_plugin:bool=False, args=None):# boxes_tablename:str='boxes', box_override:str='') -> int:
     try:
         t = Timer()
@@ -137,20 +316,20 @@ async def process(is_plugin:bool=False, args=None):# boxes_tablename:str='boxes'
 
         # refresh 
         await prepare_destination(boxes_tablename)
-        boxes = await get_all_unspent_boxes(boxes_tablename, args.override)
-        box_count = len(boxes)
-
         if not is_plugin:
             # no special processing for checkpoint call
             logger.info('Sleeping to make sure boxes are processed...')
             sleep(2)    
 
         max_height = 0 # track max height
-        last_r = 1
+        box_count = 0
+        with eng.begin() as con:
+            top_height = con.execute(f'''select max(height) as height from {boxes_tablename}''').fetchone()['height'] or 0
 
-        # process all new, unspent boxes
-        logger.info(f'BOXES: {box_count} boxes found...')
-        for r in range(last_r-1, box_count, CHECKPOINT_INTERVAL):
+        # process all new, unspent boxes; the scanner writes utxo rows from block outputs, so only boxes it missed are fetched from the node here
+        # pages are streamed from sql, and progress saved after each checkpoint so an interrupted run resumes where it left off
+        last_box = await get_progress(boxes_tablename)
+        async for boxes in get_all_unspent_boxes(boxes_tablename, args.override, last_box):
             # the node can sometimes get overwhelmed; in the event, retry
             range_retries = 0
             while range_retries < 3:
@@ -159,21 +338,17 @@ async def process(is_plugin:bool=False, args=None):# boxes_tablename:str='boxes'
                         logger.warning(f'Retry attempt {range_retries}...')
                         sleep(1) # take a deep breath before trying again...
 
-                    # determine proper slices
-                    next_r = r+CHECKPOINT_INTERVAL
-                    if next_r > box_count:
-                        next_r = box_count
-
-                    suffix = f'''{t.split()} :: Process ({next_r:,}/{box_count:,}) ...'''                    
-                    if PRETTYPRINT: printProgressBar(r, box_count, prefix=t.split(), suffix=f'{suffix}{" "*(LINELEN-len(suffix))}', length=50)
+                    page_height = boxes[-1]['height']
+                    suffix = f'''{t.split()} :: Process ({box_count+len(boxes):,} boxes; height {page_height:,}/{top_height:,}) ...'''                    
+                    if PRETTYPRINT: printProgressBar(page_height, top_height, prefix=t.split(), suffix=f'{suffix}{" "*(LINELEN-len(suffix))}', length=50)
                     else: logger.info(suffix)
 
                     utxos = {}
 
                     # find all the calls to build boxes
-                    if VERBOSE: logger.warning(f'{r}::{next_r}::{boxes[r:next_r]}, len={box_count}')
-                    urls = [[box['height'], f'''{NODE_API}/utxo/byId/{box['box_id']}'''] for box in boxes[r:next_r]]
-                    if VERBOSE: logger.debug(f'slice: {r}:{next_r} / up to height: {boxes[next_r-1]["height"]}')
+                    if VERBOSE: logger.warning(f'{box_count}::{boxes}')
+                    urls = [[box['height'], f'''{NODE_API}/utxo/byId/{box['box_id']}'''] for box in boxes]
+                    if VERBOSE: logger.debug(f'page: {len(boxes)} / up to height: {page_height}')
                     retries = 0
                     while retries < 5:
                         try:
@@ -183,35 +358,19 @@ async def process(is_plugin:bool=False, args=None):# boxes_tablename:str='boxes'
                             retries += 1
                             logger.warning(f'get ordered json retry: {retries}; {e}')
                             pass
-                    logger.debug(f'Boxes: {box_count-1}; UTXOs: {len(utxo)-1}')
+                    logger.debug(f'Boxes: {len(boxes)}; UTXOs: {len(utxo)}')
 
                     # fetch box info
-                    for ergo_tree, box_id, box_assets, registers, nergs, creation_height, transaction_id, index, height in [[u[2]['ergoTree'], u[2]['boxId'], u[2]['assets'], u[2]['additionalRegisters'], u[2]['value'], u[2]['creationHeight'], u[2]['transactionId'], u[2]['index'], u[1]] for u in utxo if u[0] == 200]:
+                    for output, height in [[u[2], u[1]] for u in utxo if u[0] == 200]:
+                        box_id = output['boxId']
                         if VERBOSE: logger.warning(f'box_id: {box_id}')
                         try:
                             # track largest height processed
                             if max_height < height:
                                 max_height = height
 
-                            # only worry about addresses for wallets
-                            if ergo_tree[:6] == '0008cd':
-                                address = ergo_tree[6:]
-                            else:
-                                address = ''
-
                             # utxo row
-                            utxos[box_id] = {
-                                'box_id': box_id,
-                                'ergo_tree': ergo_tree,
-                                'address': address,
-                                'nergs': nergs,
-                                'registers': ','.join([f'''{i}=>{j}''' for i, j in registers.items()]),
-                                'assets': ','.join([f'''{a['tokenId']}=>{a['amount']}''' for a in box_assets]),
-                                'transaction_id': transaction_id,
-                                'index': index,
-                                'creation_height': creation_height,
-                                'height': height,
-                            }          
+                            utxos[box_id] = utxo_row(output, height)
                         
                         except Exception as e:
                             logger.error(f'ERR: {e}; box_id: {box_id}')
@@ -219,12 +378,13 @@ async def process(is_plugin:bool=False, args=None):# boxes_tablename:str='boxes'
 
                     # save current unspent to sql
                     suffix = f'Checkpoint...'
-                    if PRETTYPRINT: printProgressBar(next_r, box_count, prefix=t.split(), suffix=f'{suffix}{" "*(LINELEN-len(suffix))}', length=50)
+                    if PRETTYPRINT: printProgressBar(page_height, top_height, prefix=t.split(), suffix=f'{suffix}{" "*(LINELEN-len(suffix))}', length=50)
                     else:
-                        try: percent_complete = f'{100*next_r/box_count:0.2f}%' 
+                        try: percent_complete = f'{100*page_height/top_height:0.2f}%' 
                         except: percent_complete= 0
                         logger.warning(f'{percent_complete}/{t.split()} {suffix}')
                     await checkpoint(utxos)
+                    await save_progress(boxes_tablename, (page_height, boxes[-1]['box_id']))
 
                     # track utxos height here (since looping through boxes)
                     notes = f'''{len(utxos)-1} utxos'''
@@ -235,8 +395,7 @@ async def process(is_plugin:bool=False, args=None):# boxes_tablename:str='boxes'
                     with eng.begin() as con:
                         con.execute(sql)
 
-                    # reset for outer loop: height range
-                    last_r = r
+                    box_count += len(boxes)
                     if args.override != '':
                         exit(1)
 
@@ -247,11 +406,15 @@ async def process(is_plugin:bool=False, args=None):# boxes_tablename:str='boxes'
                     pass
                 
                 except Exception as e:
-                    logger.error(f'ERR: {e}; range: {r}')
+                    logger.error(f'ERR: {e}; page up to height: {boxes[-1]["height"]}')
                     range_retries += 1
                     sleep(1) # give node a break
                     pass
 
+        # all boxes processed; next run starts from the beginning
+        await save_progress(boxes_tablename)
+        logger.info(f'BOXES: {box_count} boxes processed...')
+
         sec = t.stop()
         logger.debug(f'Processing complete: {sec:0.4f}s...{" "*50}')
 
@@ -261,6 +424,9 @@ async def process(is_plugin:bool=False, args=None):# boxes_tablename:str='boxes'
         logger.error(f'ERR: Process {e}')
         pass
 
+    finally:
+        await FETCHER.close()
+
 async def hibernate(new_height):
     hibernate_timer = Timer()
     hibernate_timer.start()
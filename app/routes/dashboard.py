@@ -1,18 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from utils.logger import logger, myself, Timer, LEIF
-from utils.db import eng
+from utils.db import aeng
+from utils.cache import cached
 from pydantic import BaseModel
+from typing import List
+from sqlalchemy import text
 
 # get by token id
 
 dashboard_router = r = APIRouter()
 
+#region INIT
+MAX_ADDRESSES = 10000 # per balances request
+#endregion INIT
+
 class Token(BaseModel):
     id: str
     name: str = ''
     decimals: int = 0
     amount: int = 0
 
+class Addresses(BaseModel):
+    addresses: List[str]
+
 # vesting by address(s)
 # staking by address(s)
 # assets by address(s)
@@ -21,15 +31,30 @@ class Token(BaseModel):
 # prices by token id ??
 # tokenomics ??
 
+# ergs and tokens held by each address (nergs/amount are raw; divide by 10^9/10^decimals), from the totals plugins/utxo keeps per address
 @r.post("/balances/")
-async def assets(addresses):
-    sql = f'''
-        select address, sum(nergs)/power(10, 9) as ergs
-        from balances 
-        where address in ({','.join([a for a in addresses])})
-        group by address
-    '''
-    with eng.begin() as con:
-        res = con.execute(sql).fetchall
-    return res
+@cached
+async def balances(req: Addresses):
+    addresses = list(dict.fromkeys(req.addresses))
+    if len(addresses) > MAX_ADDRESSES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f'at most {MAX_ADDRESSES} addresses per request')
+
+    sql = text(f'''
+        select b.address, b.nergs, t.token_id, t.amount, k.token_name, k.decimals
+        from address_balances b
+            left join address_tokens t on t.address = b.address
+            -- tokens.token_id is not unique
+            left join lateral (select token_name, decimals from tokens where token_id = t.token_id limit 1) k on true
+        where b.address = any(:addresses)
+    ''')
+    async with aeng.begin() as con:
+        res = (await con.execute(sql, {'addresses': addresses})).mappings().fetchall()
+
+    # every address requested; unknown ones hold nothing
+    result = {a: {'nergs': 0, 'tokens': []} for a in addresses}
+    for row in res:
+        result[row['address']]['nergs'] = row['nergs']
+        if row['token_id'] is not None:
+            result[row['address']]['tokens'].append({'tokenId': row['token_id'], 'amount': row['amount'], 'name': row['token_name'], 'decimals': row['decimals']})
 
+    return result
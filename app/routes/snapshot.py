@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from utils.logger import logger, myself, Timer, LEIF
-from utils.db import eng
+from utils.db import aeng
+from utils.cache import cached
 from pydantic import BaseModel
 from sqlalchemy import text
 
@@ -15,6 +16,7 @@ class Token(BaseModel):
     amount: int = 0
 
 @r.post("/byTokenId/")
+@cached
 async def snapshot(token: Token):
     try:
         token_id = token.id
@@ -28,8 +30,8 @@ async def snapshot(token: Token):
             group by token_id, address;
         ''')
         # logger.debug(sql)
-        with eng.begin() as con:
-            res = con.execute(sql, {'token_id': token_id}).fetchall()
+        async with aeng.begin() as con:
+            res = (await con.execute(sql, {'token_id': token_id})).mappings().fetchall()
 
         snp = {}
         for r in res:
@@ -1,7 +1,9 @@
 from utils.logger import logger, myself
 from time import time
-from fastapi import APIRouter
-from utils.db import eng
+from fastapi import APIRouter, HTTPException, status
+from starlette.concurrency import run_in_threadpool
+from utils.db import aeng
+from sqlalchemy import text
 from requests import get, post
 from os import getenv
 
@@ -9,32 +11,40 @@ tasks_router = r = APIRouter()
 
 USE_CELERY = getenv('USE_CELERY', 'False').lower() in ('true', '1', 't')
 
+# responds once the refresh is done (non-2xx when it failed), so callers can order dependent views and retry failures
 @r.get("/refresh/{matview}")
 async def refresh_matview(matview):
     try:
         if USE_CELERY:
-            res = post('http://d-flower:5555/api/task/async-apply/tasks.refresh_matview', json={'args':[matview]})
-            if res.ok: logger.debug(res.text)
-            else: logger.warning(res.status_code)
+            # apply (not async-apply) waits for the task result
+            res = await run_in_threadpool(post, 'http://d-flower:5555/api/task/apply/tasks.refresh_matview', json={'args':[matview]})
+            if not res.ok or res.json().get('state') != 'SUCCESS':
+                raise Exception(f'celery refresh failed; {res.status_code} {res.text}')
+            logger.debug(res.text)
         else:
-            with eng.begin() as con:
-                sql = f'''refresh materialized view concurrently {matview}'''
-                con.execute(sql)
+            async with aeng.begin() as con:
+                # refresh can outlast the api statement timeout
+                await con.execute(text('set local statement_timeout = 0'))
+                sql = text(f'''refresh materialized view concurrently {matview}''')
+                await con.execute(sql)
+                # cached api responses are stale
+                await con.execute(text('''select nextval('data_version')'''))
 
     except Exception as e:
         logger.error(f'ERR: {myself()}; {e}')
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f'refresh {matview} failed')
 
 @r.get("/refreshall/")
 async def refresh_all_matviews():
     try:
-        with eng.begin() as con:
-            sql = f'''
+        async with aeng.begin() as con:
+            sql = text(f'''
                 select matviewname
                 from pg_matviews 
                 where schemaname = 'public'
                     -- and left(viewname, 2) = 'v_'
-            '''
-            res = con.execute(sql).fetchall()
+            ''')
+            res = (await con.execute(sql)).mappings().fetchall()
 
         for r in res:
             mv = r['matviewname']
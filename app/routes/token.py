@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from utils.logger import logger, myself, Timer, LEIF
-from utils.db import eng
+from utils.db import aeng
+from utils.cache import cached
 from pydantic import BaseModel
 from typing import List
 from sqlalchemy import text
@@ -68,18 +69,19 @@ async def exists(tid: AddressTokens):
         sql = text(f'''
             with tot as (
                 select address as adr
-                    , (each(assets)).key as tkn
-                    , (each(assets)).value as qty
-                from utxos
+                    , token_id as tkn
+                    , amount as qty
+                from utxo_assets
                 where address in ({addresses})
+                    and token_id in ({tokens})
             )
             select adr, tkn, sum(qty::float)/power(10, t.decimals) as qty
             from tot
             where tkn in ({tokens})
             group by adr, tkn, t.decimals
         ''')
-        with eng.begin() as con:
-            res = con.execute(sql).fetchall()
+        async with aeng.begin() as con:
+            res = (await con.execute(sql)).mappings().fetchall()
 
         # add any that have qty
         exs = {}
@@ -94,6 +96,7 @@ async def exists(tid: AddressTokens):
         logger.error(f'ERR: {myself()}; {e}')
 
 @r.post("/locked/")
+@cached
 async def locked(tid: TokenInventoryDAO):
     try:
         # TODO: validate address
@@ -115,8 +118,8 @@ async def locked(tid: TokenInventoryDAO):
             where coalesce(fre.address, stk.address) in ({addresses})
             group by coalesce(fre.address, stk.address)
         ''')
-        with eng.begin() as con:
-            res = con.execute(sql).fetchall()
+        async with aeng.begin() as con:
+            res = (await con.execute(sql)).mappings().fetchall()
 
         # make sure all addresses exist in final set
         individual_free = {}
@@ -158,14 +161,15 @@ async def locked(tid: TokenInventoryDAO):
         logger.error(f'ERR: {myself()}; {e}')
 
 @r.get("/price/{token_id}")
+@cached
 async def get_token_price(token_id: str):
     sql = text(f'''
         select token_price, token_name, decimals
         from tokens 
         where token_id = :token_id
     ''')
-    with eng.begin() as con:
-        res = con.execute(sql, {'token_id': token_id}).fetchone()
+    async with aeng.begin() as con:
+        res = (await con.execute(sql, {'token_id': token_id})).mappings().fetchone()
 
     return {
         'id': token_id,
@@ -175,15 +179,16 @@ async def get_token_price(token_id: str):
     }
 
 @r.get("/candles/{token_id}")
-async def get_token_price(token_id: str):
+@cached
+async def get_token_candles(token_id: str):
     sql = text(f'''
         select date, price, market
         from ohlc 
         where token_id = :token_id
         order by date desc
     ''')
-    with eng.begin() as con:
-        res = con.execute(sql, {'token_id': token_id}).fetchall()
+    async with aeng.begin() as con:
+        res = (await con.execute(sql, {'token_id': token_id})).mappings().fetchall()
 
     price = res[0]['price']
     dateStamp = res[0]['date']
@@ -206,8 +211,8 @@ async def get_token_price(token_id: str):
             and price is not null
         group by tkn.tot
     ''')
-    with eng.begin() as con:
-        res = con.execute(sql, {'token_id': token_id}).fetchone()
+    async with aeng.begin() as con:
+        res = (await con.execute(sql, {'token_id': token_id})).mappings().fetchone()
 
     allTimeHigh = res['ath']
     allTimeLow = res['atl']
@@ -225,8 +230,8 @@ async def get_token_price(token_id: str):
         from tokenomics_paideia k
             join tokens t on t.token_id = k.token_id
     ''')
-    # with eng.begin() as con:
-    #     res = con.execute(sql).fetchone()
+    # async with aeng.begin() as con:
+    #     res = (await con.execute(sql)).mappings().fetchone()
 
     # currentSupply = res['current_total_supply']
     # marketCap = res['market_cap']
@@ -258,10 +263,11 @@ async def exists(tid: AddressTokens):
         sql = text(f'''
             with tot as (
                 select address as adr
-                    , (each(assets)).key as tkn
-                    , (each(assets)).value as qty
-                from utxos
+                    , token_id as tkn
+                    , amount as qty
+                from utxo_assets
                 where address in ({addresses})
+                    and token_id in ({tokens})
             )
             select adr, tkn, sum(qty::float)/power(10, t.decimals) as qty
             from tot
@@ -269,8 +275,8 @@ async def exists(tid: AddressTokens):
             where tkn in ({tokens})
             group by adr, tkn, t.decimals
         ''')
-        with eng.begin() as con:
-            res = con.execute(sql).fetchall()
+        async with aeng.begin() as con:
+            res = (await con.execute(sql)).mappings().fetchall()
 
         # add any that have qty
         exs = {}
@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi.responses import StreamingResponse
 from utils.logger import logger, myself, Timer, LEIF
-from utils.db import eng
+from utils.db import aeng
 from pydantic import BaseModel
 from typing import List
 from sqlalchemy import text
 from decimal import Decimal
+from hashlib import sha256
+from base64 import urlsafe_b64encode, urlsafe_b64decode
 
 # mint
 # burn
@@ -12,63 +17,125 @@ from decimal import Decimal
 
 utxo_router = r = APIRouter()
 
+#region INIT
+STREAM_BATCH = 500 # rows per chunk of a streamed response
+MAX_BOX_IDS = 1000 # per byIds request
+BOX_COLUMNS = 'id, box_id, ergo_tree, address, nergs, hstore_to_json_loose(registers) as registers, array_to_json(assets_array) as assets, transaction_id, index, creation_height, height'
+#endregion INIT
+
 class ErgoTreeHex(BaseModel):
     ergoTree: str
 
+class BoxIds(BaseModel):
+    ids: List[str]
+
+# utxos row in explorer format
+def box_json(row) -> dict:
+    assets = []
+    for element in row["assets"]:
+        for k in element:
+            assets.append({"tokenId": k, "amount": element[k]})
+
+    return {
+        "boxId": row["box_id"],
+        "value": row["nergs"],
+        "ergoTree": row["ergo_tree"],
+        "creationHeight": row["creation_height"],
+        "assets": assets,
+        "additionalRegisters": row["registers"],
+        "transactionId": row["transaction_id"],
+        "index": row["index"]
+    }
+
+# continuation token; opaque to clients, currently the last utxos.id returned
+def encode_cursor(id: int) -> str:
+    return urlsafe_b64encode(str(id).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> int:
+    try: return int(urlsafe_b64decode(cursor + '='*(-len(cursor) % 4)).decode())
+    except ValueError: raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='invalid cursor')
+
+def ergo_tree_hash(ergoTree: ErgoTreeHex) -> bytes:
+    # match on sha256 of the tree bytes (utxos.ergo_tree_hash, indexed with id)
+    try: return sha256(bytes.fromhex(ergoTree.ergoTree)).digest()
+    except ValueError: raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='ergoTree must be hex')
+
 @r.get("/{box_id}")
 async def get_utxo_by_id(box_id: str):
+    # utxos is hash partitioned by box_id; equality on box_id prunes to a single partition
     sql = text(f'''
-        select id, box_id, ergo_tree, address, nergs, hstore_to_json_loose(registers) as registers, array_to_json(assets_array) as assets, transaction_id, index, creation_height, height
+        select {BOX_COLUMNS}
         from utxos 
         where box_id = :box_id
     ''')
-    with eng.begin() as con:
-        res = con.execute(sql, {'box_id': box_id}).fetchone()
+    async with aeng.begin() as con:
+        res = (await con.execute(sql, {'box_id': box_id})).mappings().fetchone()
 
-    assets = []
-    for element in res["assets"]:
-        for k in element:
-            assets.append({"tokenId": k, "amount": element[k]})
+    return box_json(res)
 
-    return   {
-        "boxId": res["box_id"],
-        "value": res["nergs"],
-        "ergoTree": res["ergo_tree"],
-        "creationHeight": res["creation_height"],
-        "assets": assets,
-        "additionalRegisters": res["registers"],
-        "transactionId": res["transaction_id"],
-        "index": res["index"]
+# many boxes in one query; found boxes in request order, and ids that are not unspent
+@r.post("/byIds")
+async def get_utxos_by_ids(boxIds: BoxIds):
+    ids = list(dict.fromkeys(boxIds.ids))
+    if len(ids) > MAX_BOX_IDS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f'at most {MAX_BOX_IDS} ids per request')
+
+    sql = text(f'''
+        select {BOX_COLUMNS}
+        from utxos 
+        where box_id = any(:ids)
+    ''')
+    async with aeng.begin() as con:
+        res = (await con.execute(sql, {'ids': ids})).mappings().fetchall()
+
+    found = {row['box_id']: box_json(row) for row in res}
+    return {
+        'boxes': [found[i] for i in ids if i in found],
+        'missing': [i for i in ids if i not in found],
     }
 
+# pages by id; pass the X-Next-Cursor header of a response as cursor for the next page (offset still works, but scans every skipped row)
 @r.post("/byErgoTree")
-async def get_utxo_by_ergotree(ergoTree: ErgoTreeHex,  offset: int = 0, limit: int = 100):
+async def get_utxo_by_ergotree(ergoTree: ErgoTreeHex, response: Response, offset: int = 0, limit: int = 100, cursor: str = None):
+    params = {'ergo_tree_hash': ergo_tree_hash(ergoTree), 'after': -1 if cursor is None else decode_cursor(cursor), 'offset': offset, 'limit': limit}
     sql = text(f'''
-        select id, box_id, ergo_tree, address, nergs, hstore_to_json_loose(registers) as registers, array_to_json(assets_array) as assets, transaction_id, index, creation_height, height
+        select {BOX_COLUMNS}
         from utxos 
-        where ergo_tree = :ergo_tree
+        where ergo_tree_hash = :ergo_tree_hash
+            and id > :after
         order by id asc
         offset :offset limit :limit
     ''')
-    with eng.begin() as con:
-        res = con.execute(sql, {'ergo_tree': ergoTree.ergoTree, 'offset': offset, 'limit': limit}).fetchall()
-
-    result = []
-
-    for row in res:
-        assets = []
-        for element in row["assets"]:
-            for k in element:
-                assets.append({"tokenId": k, "amount": element[k]})
-        result.append({
-                "boxId": row["box_id"],
-                "value": row["nergs"],
-                "ergoTree": row["ergo_tree"],
-                "creationHeight": row["creation_height"],
-                "assets": assets,
-                "additionalRegisters": row["registers"],
-                "transactionId": row["transaction_id"],
-                "index": row["index"]
-            })
-
-    return result
\ No newline at end of file
+    async with aeng.begin() as con:
+        res = (await con.execute(sql, params)).mappings().fetchall()
+
+    # a full page; there may be more
+    if len(res) > 0 and len(res) == limit:
+        response.headers['X-Next-Cursor'] = encode_cursor(res[-1]['id'])
+
+    return [box_json(row) for row in res]
+
+# every box (from cursor, if any) as newline delimited json, read from a server side cursor as the client consumes it
+@r.post("/byErgoTree/stream")
+async def stream_utxo_by_ergotree(ergoTree: ErgoTreeHex, cursor: str = None):
+    params = {'ergo_tree_hash': ergo_tree_hash(ergoTree), 'after': -1 if cursor is None else decode_cursor(cursor)}
+    sql = text(f'''
+        select {BOX_COLUMNS}
+        from utxos 
+        where ergo_tree_hash = :ergo_tree_hash
+            and id > :after
+        order by id asc
+    ''')
+
+    async def rows():
+        try:
+            async with aeng.begin() as con:
+                res = await con.stream(sql, params)
+                async for batch in res.mappings().partitions(STREAM_BATCH):
+                    yield ''.join([json.dumps(box_json(row))+'\n' for row in batch])
+
+        except Exception as e:
+            # headers are already sent; the client sees a truncated stream
+            logger.error(f'ERR: {myself()}; {e}')
+
+    return StreamingResponse(rows(), media_type='application/x-ndjson')
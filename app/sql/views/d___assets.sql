@@ -2,9 +2,9 @@ create materialized view assets as
 	with a as (
 		select 
 			address
-			, (each(assets)).key::varchar(64) as token_id
-			, (each(assets)).value::bigint as amount
-		from utxos
+			, token_id
+			, amount
+		from utxo_assets
 		where address != '' -- only wallets; no smart contracts
 	)
 	-- insert into {tbl} (address, token_id, amount)
@@ -1,3 +1,4 @@
+-- refresh-when: never
 --- drop view v_token_config cascade
 create materialized view token_config as
 	select 'paideia' as token_name
@@ -6,12 +6,13 @@ create materialized view token_staked as
 		, (u.assets->tid.token_id)::bigint as amount
 		, (u.assets->tid.proxy_address)::int as proxy
 		, u.registers->'R4' as penalty
-		, regexp_replace(u.registers->'R5', '^0e20', '') as stakekey_token_id
+		, r5.token_id::text as stakekey_token_id
 		, t.decimals
 		, t.token_id
 	from utxos u
-		join token_config tid on tid.stake_tree = u.ergo_tree
+		join token_config tid on u.ergo_tree_hash = sha256(decode(tid.stake_tree, 'hex'))
 		join tokens t on t.token_id = tid.token_id
+		left join utxo_registers r5 on r5.box_id = u.box_id and r5.register = 'R5'
     
     -- with no data;
     with data;
@@ -3,11 +3,9 @@ create materialized view token_locked as
 	adr as (
 		select 
 			address
-			, id
-			, (each(assets)).key::varchar(64) as token_id
-			, (each(assets)).value::bigint as amount
-		from utxos u
-			-- join v_token_config tid on tid.stake_tree = u.ergo_tree
+			, token_id
+			, amount
+		from utxo_assets
 		where address != ''
 	)
 	select
@@ -1,3 +1,4 @@
+-- refresh-when: tokens
 -- find these values in github/ergo-paid/paideia-contracts/contract/staking/__init__.py
 
 create materialized view token_status as
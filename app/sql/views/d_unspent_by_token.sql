@@ -1,7 +1,7 @@
 create materialized view unspent_by_token as
-	select distinct (each(assets)).key as token_id
-		, box_id as box_id
-	from utxos
+	select token_id::text as token_id -- text, as when read from hstore keys
+		, box_id
+	from utxo_assets
     
     with no data;
 
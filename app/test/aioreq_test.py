@@ -0,0 +1,65 @@
+# bootstrap
+import pytest
+
+# imports
+import asyncio
+import utils.aioreq
+
+from utils.aioreq import get_json_ordered_retry, FETCHER
+
+@pytest.fixture
+def node(monkeypatch):
+    # status for each url, per request; last one repeats
+    responses, calls = {}, []
+    async def get_json_ordered(ordered_url, headers=None, proxy=None, timeout=None, body=None):
+        sort_order, url = ordered_url
+        calls.append(url)
+        status = responses[url].pop(0) if len(responses[url]) > 1 else responses[url][0]
+        if isinstance(status, Exception): raise status
+        return status, sort_order, {'url': url}
+    async def no_sleep(seconds):
+        pass
+    monkeypatch.setattr(FETCHER, 'get_json_ordered', get_json_ordered)
+    monkeypatch.setattr(utils.aioreq.asyncio, 'sleep', no_sleep)
+    return responses, calls
+
+@pytest.mark.asyncio
+async def test_retry_only_failed(node):
+    responses, calls = node
+    responses.update({'a': [200], 'b': [ValueError('reset'), 503, 200]})
+    res = await get_json_ordered_retry([[0, 'a'], [1, 'b']])
+    assert sorted([(r[0], r[1]) for r in res]) == [(200, 0), (200, 1)]
+    assert calls.count('a') == 1 and calls.count('b') == 3
+
+@pytest.mark.asyncio
+async def test_permanent_status_returned(node):
+    responses, calls = node
+    responses.update({'a': [404]})
+    assert [r[0] for r in await get_json_ordered_retry([[0, 'a']])] == [404]
+    assert calls == ['a']
+
+@pytest.mark.asyncio
+async def test_retry_rounds(node):
+    responses, calls = node
+    responses.update({'a': [503]})
+    with pytest.raises(ValueError):
+        await get_json_ordered_retry([[0, 'a']], rounds=3)
+    assert calls == ['a']*3
+
+def test_fetcher_session_per_loop():
+    from concurrent.futures import ThreadPoolExecutor
+    from utils.aioreq import Fetcher
+    fetcher = Fetcher()
+
+    async def use():
+        session = fetcher.session()
+        assert fetcher.session() is session
+        await fetcher.close()
+        return session
+
+    # each asyncio.run (here, in its own thread) gets its own session, closed with it
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        sessions = list(pool.map(lambda _: asyncio.run(use()), range(2)))
+    assert sessions[0] is not sessions[1]
+    assert all([s.closed for s in sessions])
+    assert fetcher._clients == {}
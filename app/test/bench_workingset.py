@@ -0,0 +1,81 @@
+import argparse
+import os
+import random
+import sys
+import tracemalloc
+
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.boxset import BoxSet
+
+"""
+bench_workingset.py
+-------------------
+
+- memory per box and apply throughput of the unspent working set for one window
+- memory is what stays allocated once the window's parsed blocks are released (dict keys keep the hex strings alive)
+- dict: previous representation, hex box_id -> {'height', 'nergs'}
+- boxset: utils.boxset.BoxSet
+- usage (from app/): python test/bench_workingset.py -n 300000
+
+"""
+
+# synthetic window: outputs, then inputs that spend a share of this window's outputs and some older boxes
+def window(n: int, spend: float):
+    outputs = [(random.randbytes(32).hex(), 1000000+i//500, random.randint(10**6, 10**12)) for i in range(n)]
+    inputs = [o[0] for o in random.sample(outputs, int(n*spend/2))] + [random.randbytes(32).hex() for _ in range(int(n*spend/2))]
+    return outputs, inputs
+
+def apply_dict(outputs, inputs):
+    unspent = {}
+    for box_id, height, nergs in outputs:
+        unspent[box_id] = {'height': height, 'nergs': nergs}
+    for box_id in inputs:
+        unspent[box_id] = {'height': -1, 'nergs': 0}
+    return unspent
+
+def apply_boxset(outputs, inputs):
+    unspent = BoxSet()
+    for box_id, height, nergs in outputs:
+        unspent.add(box_id, height, nergs)
+    for box_id in inputs:
+        unspent.spend(box_id)
+    return unspent
+
+def iterate_dict(unspent):
+    return sum(1 for box_id, n in unspent.items() if n['height'] != -1)
+
+def iterate_boxset(unspent):
+    return sum(1 for box_id, height, nergs in unspent.rows() if height != -1)
+
+def bench(name, apply, iterate, n, spend):
+    random.seed(0)
+    tracemalloc.start()
+    outputs, inputs = window(n, spend)
+    unspent = apply(outputs, inputs)
+    del outputs, inputs
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    random.seed(0)
+    outputs, inputs = window(n, spend)
+    start = perf_counter()
+    unspent = apply(outputs, inputs)
+    applied = perf_counter()-start
+
+    start = perf_counter()
+    iterate(unspent)
+    iterated = perf_counter()-start
+
+    boxes = len(unspent)
+    print(f'{name:8} {boxes:>9,} boxes {size/boxes:>7.1f} B/box {(len(outputs)+len(inputs))/applied:>12,.0f} ops/s apply {boxes/iterated:>12,.0f} boxes/s iterate')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--outputs", help="Outputs per window", type=int, default=300000)
+    parser.add_argument("-s", "--spend", help="Inputs as a share of outputs", type=float, default=0.8)
+    args = parser.parse_args()
+
+    bench('dict', apply_dict, iterate_dict, args.outputs, args.spend)
+    bench('boxset', apply_boxset, iterate_boxset, args.outputs, args.spend)
@@ -0,0 +1,50 @@
+# bootstrap
+import pytest
+
+# imports
+from utils.boxset import BoxSet
+
+BOX_A = 'aa'*32
+BOX_B = 'bb'*32
+BOX_C = 'cc'*32
+
+def test_add_spend():
+    unspent = BoxSet()
+    unspent.add(BOX_A, 10, 1000)
+    unspent.add(BOX_B, 11, 2000)
+    unspent.spend(BOX_A)
+    unspent.spend(BOX_C) # created before this window
+    assert len(unspent) == 3
+    assert list(unspent.rows()) == [(BOX_A, -1, 0), (BOX_B, 11, 2000), (BOX_C, -1, 0)]
+    assert unspent.get(BOX_B) == (11, 2000)
+    assert unspent.get('dd'*32) is None
+    assert BOX_C in unspent and 'dd'*32 not in unspent
+    assert list(unspent) == [BOX_A, BOX_B, BOX_C]
+
+def test_keyed_rows():
+    unspent = BoxSet()
+    unspent.add(BOX_A, 10, 1000)
+    assert list(unspent.keyed_rows()) == [(bytes.fromhex(BOX_A), 10, 1000)]
+
+def test_update_later_wins():
+    earlier, later = BoxSet(), BoxSet()
+    earlier.add(BOX_A, 10, 1000)
+    earlier.add(BOX_B, 10, 2000)
+    later.spend(BOX_A)
+    later.add(BOX_C, 20, 3000)
+    earlier.update(later)
+    assert list(earlier.rows()) == [(BOX_A, -1, 0), (BOX_B, 10, 2000), (BOX_C, 20, 3000)]
+
+def test_transient():
+    unspent = BoxSet()
+    unspent.add(BOX_A, 10, 1000)
+    unspent.spend(BOX_A) # created and spent here
+    unspent.spend(BOX_B) # created before this window
+    assert unspent.transient() == {bytes.fromhex(BOX_A): 10}
+    merged = BoxSet()
+    merged.add(BOX_C, 9, 500)
+    later = BoxSet()
+    later.spend(BOX_C)
+    merged.update(unspent)
+    merged.update(later)
+    assert merged.transient() == {bytes.fromhex(BOX_A): 10, bytes.fromhex(BOX_C): 9}
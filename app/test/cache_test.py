@@ -0,0 +1,87 @@
+# bootstrap
+import pytest
+
+from os import environ
+environ.setdefault('POSTGRES_PORT', '5432') # engines are created on import (no connection is made)
+
+# imports
+import utils.cache
+
+from time import sleep
+from fastapi import Response
+from starlette.requests import Request
+from utils.cache import ResponseCache, cache_key, cached
+
+class Route:
+    def __init__(self, path: str):
+        self.path = path
+
+def request(path: str, etag: str=None) -> Request:
+    return Request({
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'headers': [] if etag is None else [(b'if-none-match', etag.encode())],
+        'route': Route(path),
+    })
+
+@pytest.fixture
+def version(monkeypatch):
+    async def data_version():
+        return 1
+    monkeypatch.setattr(utils.cache, 'data_version', data_version)
+    monkeypatch.setattr(utils.cache, 'CACHE', ResponseCache())
+
+def test_cache_key_stable():
+    assert cache_key('GET /locked/', {'a': 1, 'b': [1, 2]}, 7) == cache_key('GET /locked/', {'b': [1, 2], 'a': 1}, 7)
+    assert cache_key('GET /locked/', {'a': 1}, 7) != cache_key('GET /locked/', {'a': 1}, 8)
+
+def test_cache_lru():
+    cache = ResponseCache(size=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3) # b is least recently used
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c'), len(cache)) == (1, 3, 2)
+
+def test_cache_ttl():
+    cache = ResponseCache(ttl=0.01)
+    cache.put('a', 1)
+    sleep(0.02)
+    assert cache.get('a') is None
+
+@pytest.mark.asyncio
+async def test_cached_same_params_different_routes(version):
+    # same handler name and params (as /price and /candles once were)
+    def handler(route: str):
+        @cached
+        async def get_token_price(token_id: str):
+            return {'route': route, 'id': token_id}
+        return get_token_price
+    price, candles = handler('price'), handler('candles')
+
+    price_response, candles_response = Response(), Response()
+    assert (await price('t', request=request('/price/{token_id}'), response=price_response))['route'] == 'price'
+    assert (await candles('t', request=request('/candles/{token_id}'), response=candles_response))['route'] == 'candles'
+    assert price_response.headers['etag'] != candles_response.headers['etag']
+
+@pytest.mark.asyncio
+async def test_cached_etag(version):
+    calls = []
+    @cached
+    async def price(token_id: str):
+        calls.append(token_id)
+        return {'id': token_id}
+
+    response = Response()
+    assert await price('t', request=request('/price/{token_id}'), response=response) == {'id': 't'}
+    assert await price('t', request=request('/price/{token_id}'), response=Response()) == {'id': 't'}
+    assert calls == ['t']
+
+    not_modified = await price('t', request=request('/price/{token_id}', response.headers['etag']), response=Response())
+    assert not_modified.status_code == 304
+
+    # called directly (not through fastapi), not cached
+    assert await price('u') == {'id': 'u'}
+    assert calls == ['t', 'u']
@@ -0,0 +1,27 @@
+# bootstrap
+import pytest
+
+from os import environ
+environ.setdefault('POSTGRES_PORT', '5432') # engines are created on import (no connection is made)
+
+# imports
+import asyncpg
+
+from utils.db import aeng, API_STATEMENT_TIMEOUT
+
+class Connecting(Exception):
+    pass
+
+# what the api engine hands asyncpg when it opens a connection
+@pytest.mark.asyncio
+async def test_async_engine_connect_args(monkeypatch):
+    async def connect(*args, **kwargs):
+        raise Connecting(kwargs)
+    monkeypatch.setattr(asyncpg, 'connect', connect)
+
+    with pytest.raises(Connecting) as e:
+        async with aeng.connect():
+            pass
+    kwargs = e.value.args[0]
+    assert kwargs['server_settings'] == {'statement_timeout': str(API_STATEMENT_TIMEOUT)}
+    assert kwargs['database'] == aeng.url.database and kwargs['port'] == aeng.url.port
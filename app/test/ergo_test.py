@@ -0,0 +1,37 @@
+# bootstrap
+import pytest
+
+# imports
+from utils.ergo import raw_to_address, Network, decode_register, RegisterType
+
+# mainnet P2PK address and its public key (ergo tree 0008cd + pubkey)
+PUBKEY = '03758aa1318ef38daac0c2c3b334ef3e656f09530f8a7b7f8058f27fdab3ea475c'
+ADDRESS = '9hMa8bqVq31HYaCqbufEbWZFURFrHhxuHui3w1dmAtFCF1r4LZm'
+
+def test_raw_to_address():
+    assert raw_to_address(PUBKEY, Network.Mainnet) == ADDRESS
+
+def test_raw_to_address_testnet():
+    assert raw_to_address(PUBKEY, Network.Testnet)[0] == '3'
+
+def test_raw_to_address_invalid():
+    assert raw_to_address('not hex') == ''
+    assert raw_to_address(PUBKEY[:-2]) == '' # short
+    assert raw_to_address('04'+PUBKEY[2:]) == '' # prefix
+
+def test_decode_register_coll_byte():
+    kind, value = decode_register('0e20'+'ab'*32)
+    assert kind == RegisterType.CollByte and value == bytes.fromhex('ab'*32)
+
+def test_decode_register_long():
+    assert decode_register('0580897a') == (RegisterType.Long, 1000000)
+    assert decode_register('0401') == (RegisterType.Int, -1)
+
+def test_decode_register_coll_long():
+    assert decode_register('1103020304') == (RegisterType.CollLong, [1, -2, 2])
+
+def test_decode_register_unknown():
+    assert decode_register('0e05ab') == (None, None) # short
+    assert decode_register('040200') == (None, None) # trailing bytes
+    assert decode_register('0101') == (None, None) # boolean, not decoded
+    assert decode_register('') == (None, None)
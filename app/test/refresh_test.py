@@ -0,0 +1,44 @@
+# bootstrap
+import pytest
+
+# imports
+from os import path
+from utils.refresh import load_views, RefreshScheduler, ChangeSet
+
+VIEW_DIR = path.join(path.dirname(path.dirname(path.abspath(__file__))), 'sql', 'views')
+TARGETS = ['assets', 'balances', 'token_status', 'token_free']
+STATUS_TOKEN = '05cde13424a7972fbcd0b43fccbb5e501b1f75302175178fc86d8f243f3f3125' # ergopad staking state nft
+P2PK = '0008cd'+'02'*33
+ADDRESS = '9hMa8bqVq31HYaCqbufEbWZFURFrHhxuHui3w1dmAtFCF1r4LZm'
+BOX_ID = '00'*32
+
+@pytest.fixture
+def scheduler():
+    changes = ChangeSet()
+    changes.clear()
+    return RefreshScheduler(TARGETS, lambda view: True, view_dir=VIEW_DIR, changes=changes)
+
+def test_load_views():
+    views = load_views(VIEW_DIR)
+    assert views['token_free'].reads >= {'assets', 'token_config'}
+    assert 'tokens' in views['token_status'].when
+
+def test_plan_nothing_changed(scheduler):
+    assert scheduler.plan(scheduler.changes) == []
+
+def test_plan_dependencies_after(scheduler):
+    scheduler.changes.box(BOX_ID, P2PK, ADDRESS, [])
+    assert scheduler.plan(scheduler.changes) == [['assets', 'balances'], ['token_free']]
+
+def test_plan_narrowed(scheduler):
+    scheduler.changes.box(BOX_ID, P2PK, ADDRESS, [STATUS_TOKEN])
+    assert 'token_status' in scheduler.plan(scheduler.changes)[0]
+    scheduler.changes.clear()
+    scheduler.changes.box(BOX_ID, P2PK, ADDRESS, [])
+    assert 'token_status' not in scheduler.plan(scheduler.changes)[0]
+
+def test_refresh_retries_failed():
+    changes = ChangeSet()
+    scheduler = RefreshScheduler(['balances'], lambda view: False, view_dir=VIEW_DIR, changes=changes)
+    assert scheduler.refresh() == []
+    assert scheduler.plan(changes) == [['balances']]
@@ -0,0 +1,37 @@
+# bootstrap
+import pytest
+
+from os import environ
+environ.setdefault('POSTGRES_PORT', '5432') # engines are created on import (no connection is made)
+
+# imports
+import json
+import routes.tasks
+
+from fastapi import HTTPException
+from requests import Response
+from routes.tasks import refresh_matview
+
+def flower(state: str, status_code: int=200):
+    def post(url: str, **kwargs):
+        assert '/api/task/apply/' in url # waits for the result
+        res = Response()
+        res.status_code = status_code
+        res._content = json.dumps({'task-id': '1', 'state': state}).encode()
+        return res
+    return post
+
+@pytest.mark.asyncio
+async def test_celery_refresh_done(monkeypatch):
+    monkeypatch.setattr(routes.tasks, 'USE_CELERY', True)
+    monkeypatch.setattr(routes.tasks, 'post', flower('SUCCESS'))
+    await refresh_matview('token_free')
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('state, status_code', [('FAILURE', 200), ('SUCCESS', 503)])
+async def test_celery_refresh_failed(monkeypatch, state, status_code):
+    monkeypatch.setattr(routes.tasks, 'USE_CELERY', True)
+    monkeypatch.setattr(routes.tasks, 'post', flower(state, status_code))
+    with pytest.raises(HTTPException) as e:
+        await refresh_matview('token_free')
+    assert e.value.status_code == 500
@@ -0,0 +1,33 @@
+# bootstrap
+import pytest
+
+from os import environ
+environ.setdefault('POSTGRES_PORT', '5432') # engines are created on import (no connection is made)
+pytest.importorskip('ergo_python_appkit') # plugins.token falls back to appkit for uncommon registers
+
+# imports
+from plugins.token import process
+
+TOKEN_ID = 'ab'*32
+
+# Coll[Byte] register (short values only; length fits one vlq byte)
+def coll_byte(value: bytes) -> str:
+    return f'0e{len(value):02x}{value.hex()}'
+
+def mint(registers: dict) -> list:
+    return [{
+        'inputs': [{'boxId': TOKEN_ID}],
+        'outputs': [{'boxId': 'cd'*32, 'assets': [{'tokenId': TOKEN_ID, 'amount': 1000}], 'additionalRegisters': registers}],
+    }]
+
+@pytest.mark.asyncio
+async def test_utf8_name():
+    tokens = await process(mint({'R4': coll_byte('Ergö 🚀'.encode()), 'R6': coll_byte(b'6')}), {}, 100)
+    token = tokens[TOKEN_ID]
+    assert (token.token_name, token.decimals, token.amount, token.height) == ('Ergö 🚀', 6, 1000, 100)
+
+@pytest.mark.asyncio
+async def test_invalid_utf8_name():
+    tokens = await process(mint({'R4': coll_byte(b'ok\xff'), 'R6': '0404'}), {}, 100)
+    assert tokens[TOKEN_ID].token_name == 'ok�'
+    assert tokens[TOKEN_ID].decimals == 2 # Int register
@@ -0,0 +1,78 @@
+# bootstrap
+import pytest
+
+from os import environ
+environ.setdefault('POSTGRES_PORT', '5432') # engines are created on import (no connection is made)
+
+# imports
+from fastapi import HTTPException
+import routes.utxo
+
+from routes.utxo import encode_cursor, decode_cursor, ergo_tree_hash, ErgoTreeHex, get_utxos_by_ids, BoxIds, MAX_BOX_IDS
+
+@pytest.mark.parametrize('id', [0, 1, 99, 123456789, 2**62])
+def test_cursor_round_trip(id):
+    cursor = encode_cursor(id)
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == id
+
+@pytest.mark.parametrize('cursor', ['!!', 'abc', encode_cursor(1)[:-1] + '*', 'bm90LWFuLWlk'])
+def test_invalid_cursor(cursor):
+    with pytest.raises(HTTPException) as e:
+        decode_cursor(cursor)
+    assert e.value.status_code == 400
+
+def test_ergo_tree_hex():
+    assert len(ergo_tree_hash(ErgoTreeHex(ergoTree='0008cd'))) == 32
+    with pytest.raises(HTTPException) as e:
+        ergo_tree_hash(ErgoTreeHex(ergoTree='not hex'))
+    assert e.value.status_code == 400
+
+class Connection:
+    def __init__(self, rows: list):
+        self.rows = rows
+        self.params = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def execute(self, sql, params: dict):
+        self.params = params
+        return self
+
+    def mappings(self):
+        return self
+
+    def fetchall(self):
+        return self.rows
+
+class Engine:
+    def __init__(self, rows: list):
+        self.con = Connection(rows)
+
+    def begin(self):
+        return self.con
+
+def box(i: int) -> dict:
+    return {'box_id': f'{i:064x}', 'nergs': i, 'ergo_tree': '0008cd', 'creation_height': 1, 'assets': [{'aa'*32: 5}], 'registers': {}, 'transaction_id': 'ff'*32, 'index': 0}
+
+@pytest.mark.asyncio
+async def test_by_ids_limit(monkeypatch):
+    monkeypatch.setattr(routes.utxo, 'aeng', None) # must fail before any query
+    with pytest.raises(HTTPException) as e:
+        await get_utxos_by_ids(BoxIds(ids=[f'{i:064x}' for i in range(MAX_BOX_IDS+1)]))
+    assert e.value.status_code == 400
+
+@pytest.mark.asyncio
+async def test_by_ids_order_and_missing(monkeypatch):
+    engine = Engine([box(3), box(1)])
+    monkeypatch.setattr(routes.utxo, 'aeng', engine)
+    ids = [f'{i:064x}' for i in (1, 2, 3, 1)]
+    res = await get_utxos_by_ids(BoxIds(ids=ids))
+    assert engine.con.params['ids'] == ids[:3] # duplicates queried once
+    assert [b['boxId'] for b in res['boxes']] == [ids[0], ids[2]]
+    assert res['missing'] == [ids[1]]
+    assert res['boxes'][0]['assets'] == [{'tokenId': 'aa'*32, 'amount': 5}]
@@ -0,0 +1,79 @@
+# bootstrap
+import pytest
+
+# imports
+import os
+from utils.boxset import BoxSet
+from utils.utxocache import UtxoCache
+
+def box(i: int) -> str:
+    return f'{i:064x}'
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = UtxoCache(max_boxes=4, spill_dir=str(tmp_path))
+    yield cache
+    cache.close()
+
+def test_created_and_spent_between_flushes(cache):
+    cache.add(box(1), 10, 1000)
+    cache.spend(box(1))
+    cache.spend(box(2)) # created before last flush
+    assert list(cache.drain().rows()) == [(box(2), -1, 0)]
+    assert len(cache) == 0
+
+def test_spill(cache, tmp_path):
+    for i in range(5):
+        cache.add(box(i), 10+i, 1000*i)
+    assert cache._spilled == 2 # oldest half of 5
+    assert len(cache._created) == 3
+    assert len(cache) == 5
+    assert len(os.listdir(tmp_path)) == 1
+
+def test_unspill_on_spend(cache):
+    for i in range(5):
+        cache.add(box(i), 10+i, 1000*i)
+    cache.spend(box(0)) # on disk
+    cache.spend(box(4)) # in memory
+    assert cache._spilled == 1
+    assert len(cache._spent) == 0
+    assert sorted(cache.drain().rows()) == [(box(1), 11, 1000), (box(2), 12, 2000), (box(3), 13, 3000)]
+
+def test_drain_resets(cache):
+    for i in range(5):
+        cache.add(box(i), 10+i, 1000*i)
+    cache.spend(box(9))
+    delta = cache.drain()
+    assert isinstance(delta, BoxSet)
+    assert len(delta) == 6
+    assert delta.get(box(9)) == (-1, 0)
+    assert delta.get(box(0)) == (10, 0)
+    assert len(cache) == 0 and cache._spilled == 0
+    assert len(cache.drain()) == 0
+
+def test_apply_window(cache):
+    cache.add(box(1), 10, 1000)
+    window = BoxSet()
+    window.add(box(2), 11, 2000)
+    window.spend(box(1))
+    window.spend(box(3))
+    window.add(box(4), 11, 4000)
+    window.spend(box(4)) # created and spent in the window; never written
+    cache.apply(window, 10)
+    assert sorted(cache.drain().rows()) == [(box(2), 11, 2000), (box(3), -1, 0)]
+
+def test_apply_window_first_block(cache):
+    # windows share a block; a box from it may have been written by the previous flush
+    window = BoxSet()
+    window.add(box(1), 10, 1000)
+    window.spend(box(1))
+    cache.apply(window, 10)
+    assert list(cache.drain().rows()) == [(box(1), -1, 0)]
+
+def test_close_removes_spill(tmp_path):
+    cache = UtxoCache(max_boxes=1, spill_dir=str(tmp_path))
+    cache.add(box(1), 10, 1000)
+    cache.add(box(2), 11, 2000)
+    assert len(os.listdir(tmp_path)) == 1
+    cache.close()
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,46 @@
+# bootstrap
+import pytest
+
+# imports
+from utils.window import WindowSizer, GROWTH, TARGET_FETCH, TARGET_CHECKPOINT
+
+def test_clamped():
+    assert WindowSizer(10, 50, 5000).size == 50
+    assert WindowSizer(9000, 50, 5000).size == 5000
+    assert WindowSizer(100, 50, 20).size == 50 # max never below min
+
+def test_grow_limited():
+    sizer = WindowSizer(100, 50, 5000)
+    sizer.applied(100, 10, 10) # cheap window
+    assert sizer.size == 100*GROWTH
+    sizer.applied(200, 10, 10)
+    assert sizer.size == 100*GROWTH*GROWTH
+
+def test_grow_to_max():
+    sizer = WindowSizer(4000, 50, 5000)
+    sizer.applied(4000, 10, 10)
+    assert sizer.size == 5000
+
+def test_shrink_immediately():
+    sizer = WindowSizer(1000, 50, 5000)
+    sizer.applied(1000, 500000, 10) # 10x target transactions
+    assert sizer.size == 100
+
+def test_shrink_to_min():
+    sizer = WindowSizer(1000, 50, 5000)
+    sizer.applied(1000, 10, 10)
+    sizer.written(1000, TARGET_CHECKPOINT*1000) # very slow checkpoint
+    assert sizer.size == 50
+
+def test_smallest_suggestion_wins():
+    sizer = WindowSizer(1000, 50, 5000)
+    sizer.fetched(1000, TARGET_FETCH*4) # suggests 250
+    sizer.applied(1000, 10, 10) # suggests far more
+    assert sizer.size == 250
+
+def test_ignores_empty():
+    sizer = WindowSizer(1000, 50, 5000)
+    sizer.fetched(0, 1)
+    sizer.applied(0, 0, 0)
+    sizer.written(1000, 0)
+    assert sizer.size == 1000
@@ -2,13 +2,130 @@ import asyncio
 # from asyncio.log import logger
 from utils.logger import logger
 import json
+import random
+import threading
 
+from os import getenv
+from time import perf_counter
+from collections import deque
 from typing import Dict, Any, List, Tuple
-from aiohttp import ClientSession
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
 
 TIMEOUT = 5
 VERBOSE = False
 HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 6.1; Trident/7.0; rv:11.0) like Gecko',"Content-Type": "application/json"}
+CONNECTION_LIMIT = int(getenv('NODE_CONNECTION_LIMIT', 64)) # open sockets to the node
+CONCURRENCY = int(getenv('NODE_CONCURRENCY', 32)) # requests in flight
+RETRIES = int(getenv('NODE_RETRIES', 4)) # per url
+BACKOFF = 0.25 # seconds; doubles each retry, plus jitter
+KEEPALIVE = 30 # seconds to hold idle connections open
+RETRY_STATUS = (429, 500, 502, 503, 504)
+RETRY_ROUNDS = 5 # get_json_ordered_retry passes over failed urls before giving up
+LATENCY_SAMPLES = 10000
+
+# long-lived http client; one pooled session, bounded in-flight window, per-url retry
+class Fetcher:
+    def __init__(self, limit: int=CONNECTION_LIMIT, concurrency: int=CONCURRENCY, retries: int=RETRIES, backoff: float=BACKOFF, timeout: int=TIMEOUT, headers: Dict=HEADERS):
+        self.limit = limit
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.headers = headers
+        self._clients = {} # event loop -> (session, semaphore)
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self._since = perf_counter()
+        self._requests = 0
+        self._retries = 0
+        self._failures = 0
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = perf_counter() - self._since
+        latencies = sorted(self._latencies)
+        pct = lambda p: 1000*latencies[min(len(latencies)-1, int(p*len(latencies)))] if latencies else 0.0
+        return {
+            'requests': self._requests,
+            'retries': self._retries,
+            'failures': self._failures,
+            'requests_per_sec': self._requests/elapsed if elapsed > 0 else 0.0,
+            'p50_ms': pct(.50),
+            'p99_ms': pct(.99),
+        }
+
+    # sessions are bound to an event loop, and main.py calls asyncio.run for each step (and resync workers, in their own threads/processes); one session per loop
+    def client(self) -> Tuple[ClientSession, asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            # loops that ended without close(); their transports went with the loop
+            for ended in [l for l in self._clients if l.is_closed()]:
+                logger.warning('Fetcher: session left open by a finished event loop; call FETCHER.close() before asyncio.run returns')
+                del self._clients[ended]
+
+            if loop not in self._clients or self._clients[loop][0].closed:
+                connector = TCPConnector(limit=self.limit, keepalive_timeout=KEEPALIVE)
+                self._clients[loop] = (ClientSession(connector=connector, timeout=ClientTimeout(total=self.timeout)), asyncio.Semaphore(self.concurrency))
+            return self._clients[loop]
+
+    def session(self) -> ClientSession:
+        return self.client()[0]
+
+    # close the running loop's session; every asyncio.run that fetches calls this before returning
+    async def close(self):
+        with self._lock:
+            session, _ = self._clients.pop(asyncio.get_running_loop(), (None, None))
+        try:
+            if session is not None and not session.closed:
+                await session.close()
+        except Exception as e:
+            logger.warning(f'Fetcher.close: {e}')
+
+    # get one url (post, when body is given); retry connection errors and busy responses with exponential backoff and jitter
+    async def get_json_ordered(self, ordered_url: List, headers: Dict=None, proxy: str=None, timeout: int=None, body: Any=None) -> (int, int, Dict[str, Any]):
+        sort_order, url = ordered_url
+        session, semaphore = self.client()
+        attempt = 0
+        while True:
+            status, response_json, err = None, None, None
+            async with semaphore:
+                beg = perf_counter()
+                try:
+                    kwargs = {'headers': headers or self.headers, 'proxy': proxy}
+                    if timeout is not None: kwargs['timeout'] = ClientTimeout(total=timeout)
+                    if body is not None: kwargs['json'] = body
+                    async with session.request('POST' if body is not None else 'GET', url, **kwargs) as res:
+                        status = res.status
+                        response_json = await res.json(content_type=None)
+                except Exception as e:
+                    err = e
+                self._latencies.append(perf_counter()-beg)
+                self._requests += 1
+
+            if err is None and (status not in RETRY_STATUS or attempt >= self.retries):
+                if VERBOSE and (status != 200):
+                    logger.debug(f'{sort_order}: url {url}; status {status}; {response_json}')
+                return status, sort_order, response_json
+
+            if attempt >= self.retries:
+                self._failures += 1
+                logger.warning(f'Fetcher.get_json_ordered; {url}: {err}')
+                raise ValueError(f'Fetcher.get_json_ordered; {url}: {err}')
+
+            # wait outside the semaphore so other requests keep moving
+            attempt += 1
+            self._retries += 1
+            delay = self.backoff*(2**(attempt-1))
+            if VERBOSE: logger.debug(f'retry {attempt} in {delay:0.2f}s: {url} ({status or err})')
+            await asyncio.sleep(delay + random.uniform(0, delay))
+
+    async def get_all_json_ordered(self, urls: List[Tuple[int, str]], headers: Dict=None, proxy: str=None, timeout: int=None) -> List[Tuple[int, int, Dict[str, Any]]]:
+        return await asyncio.gather(*[self.get_json_ordered(url, headers, proxy, timeout) for url in urls])
+
+# shared by main and plugins; keeps connections to the node alive between calls
+FETCHER = Fetcher()
 
 # async get content
 async def http_get_content_aiohttp(
@@ -94,28 +211,61 @@ async def get_json(
     timeout: int = TIMEOUT
 ) -> (List[Tuple[int, Dict[str, Any]]], float):
     try:
-        session = ClientSession()
-        res = await asyncio.gather(*[http_get_json_aiohttp(session, url, headers, proxy, timeout) for url in urls])
-        await session.close()
-        return res
+        res = await FETCHER.get_all_json_ordered(list(enumerate(urls)), headers, proxy, timeout)
+        return [(status, response_json) for status, _, response_json in res]
     except Exception as e: 
         logger.warning(f'get_json.session.get: {e}')
         pass
 
 async def get_json_ordered(
-    # session: ClientSession, 
     urls: List[Tuple[int, str]], 
     headers: Dict = HEADERS, 
     proxy: str = None, 
     timeout: int = TIMEOUT
 ) -> (List[Tuple[int, int, Dict[str, Any]]], float):
     try:
-        session = ClientSession()
-        res = await asyncio.gather(*[http_get_json_ordered_aiohttp(session, url, headers, proxy, timeout) for url in urls])
-        await session.close()
-        return res
+        return await FETCHER.get_all_json_ordered(urls, headers, proxy, timeout)
     except Exception as e:
         logger.warning(f'get_json_ordered.gather: {e}')
         raise ValueError(f'get_json_ordered; {e}')
-    finally:
-        await session.close()
+
+# results for urls that answered (any status the caller should see), and the urls that did not (errors, or transient status after the fetcher's own retries)
+async def get_json_ordered_partial(
+    urls: List[Tuple[int, str]], 
+    headers: Dict = HEADERS, 
+    retry_status: Tuple = RETRY_STATUS,
+) -> (List[Tuple[int, int, Dict[str, Any]]], List[Tuple[int, str]]):
+    res = await asyncio.gather(*[FETCHER.get_json_ordered(url, headers) for url in urls], return_exceptions=True)
+    found, failed = [], []
+    for url, r in zip(urls, res):
+        if isinstance(r, Exception) or r[0] in retry_status: failed.append(url)
+        else: found.append(r)
+
+    return found, failed
+
+# request again only the urls that failed, up to rounds times; other statuses (i.e. 404) are returned to the caller, as get_json_ordered does
+async def get_json_ordered_retry(
+    urls: List[Tuple[int, str]], 
+    headers: Dict = HEADERS, 
+    max_pause: int = 20,
+    rounds: int = RETRY_ROUNDS,
+) -> List[Tuple[int, int, Dict[str, Any]]]:
+    res = []
+    retries = 0
+    while len(urls) > 0:
+        found, urls = await get_json_ordered_partial(urls, headers)
+        res += found
+        if len(urls) == 0:
+            break
+
+        retries += 1
+        if retries >= rounds:
+            logger.warning(f'get_json_ordered_retry: {len(urls)} requests failed after {retries} rounds')
+            raise ValueError(f'get_json_ordered_retry; {len(urls)} requests failed after {retries} rounds (i.e. {urls[0][1]})')
+
+        # take a beat, without blocking the event loop
+        pause = min(max_pause, 2**retries)
+        logger.warning(f'retry: {retries}; {len(urls)} failed requests, sleeping for {pause}s.')
+        await asyncio.sleep(pause)
+
+    return res
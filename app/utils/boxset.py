@@ -0,0 +1,77 @@
+from array import array
+from binascii import unhexlify
+
+"""
+boxset.py
+---------
+
+- compact working set of boxes for a checkpoint window
+- one row per box in parallel arrays (height, nergs); index from 32 byte box id to row
+- spending a box marks its row (height -1, see checkpoint); rows are never removed, so row order is insertion order (same as the index)
+- boxes both created and spent in the set are remembered with their creation height (transient), so callers can tell them from boxes spent from earlier windows
+- box ids are converted to bytes once, as they are added/spent; keyed methods (_set, keyed_rows) pass bytes along (i.e. utils/utxocache.py)
+
+"""
+
+class BoxSet:
+    __slots__ = ('_index', '_heights', '_nergs', '_transient')
+
+    def __init__(self):
+        self._index = {} # box_id (bytes) -> row
+        self._heights = array('i') # -1 indicates spent
+        self._nergs = array('q')
+        self._transient = {} # box_id (bytes) -> height created; created, then spent
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, box_id: str):
+        return unhexlify(box_id) in self._index
+
+    def __iter__(self):
+        return map(bytes.hex, self._index)
+
+    # one index lookup; a new key gets the next row
+    def _set(self, key: bytes, height: int, nergs: int):
+        heights = self._heights
+        n = len(heights)
+        row = self._index.setdefault(key, n)
+        if row == n:
+            heights.append(height)
+            self._nergs.append(nergs)
+        else:
+            if height == -1 and heights[row] != -1:
+                self._transient[key] = heights[row]
+            heights[row] = height
+            self._nergs[row] = nergs
+
+    def add(self, box_id: str, height: int, nergs: int):
+        self._set(unhexlify(box_id), height, nergs)
+
+    def spend(self, box_id: str):
+        self._set(unhexlify(box_id), -1, 0)
+
+    # (height, nergs), or None if box not in this set
+    def get(self, box_id: str):
+        row = self._index.get(unhexlify(box_id))
+        if row is None:
+            return None
+        return self._heights[row], self._nergs[row]
+
+    # (box_id, height, nergs) in insertion order
+    def rows(self):
+        return zip(map(bytes.hex, self._index), self._heights, self._nergs)
+
+    # same, with 32 byte box ids
+    def keyed_rows(self):
+        return zip(self._index, self._heights, self._nergs)
+
+    # 32 byte box id -> height created, for boxes created and spent in this set (rows at height -1 that may not exist outside it)
+    def transient(self) -> dict:
+        return self._transient
+
+    # later sets override earlier ones
+    def update(self, other: 'BoxSet'):
+        for key, height, nergs in other.keyed_rows():
+            self._set(key, height, nergs)
+        self._transient.update(other._transient)
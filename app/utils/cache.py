@@ -0,0 +1,109 @@
+import inspect
+import json
+
+from os import getenv
+from time import monotonic
+from hashlib import blake2b
+from functools import wraps
+from collections import OrderedDict
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import text
+from utils.db import aeng
+from utils.logger import logger
+
+"""
+cache.py
+--------
+
+- responses of read endpoints, keyed by (method and route path, normalized params, data version)
+- data version is the data_version sequence, bumped (utils/db.bump_data_version) by main after each window and after refreshing views, by plugins/prices and by the refresh task (api or celery), after the refresh commits
+- each api worker keeps its own LRU of CACHE_SIZE responses; entries also expire after CACHE_TTL, in case a bump is missed
+- ETag is the key hash; If-None-Match returns 304 while the data version is unchanged
+
+"""
+
+#region INIT
+CACHE_SIZE = int(getenv('API_CACHE_SIZE', 1024)) # responses per api worker
+CACHE_TTL = 300 # seconds
+VERSION_TTL = 1 # seconds a data version read is reused
+#endregion INIT
+
+class ResponseCache:
+    def __init__(self, size: int=CACHE_SIZE, ttl: float=CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict() # key -> (expires, value)
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: str, value):
+        self._entries[key] = (monotonic()+self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+CACHE = ResponseCache()
+_version = (0.0, None) # (read at, version)
+
+async def data_version() -> int:
+    global _version
+    if _version[1] is None or monotonic()-_version[0] > VERSION_TTL:
+        async with aeng.begin() as con:
+            version = (await con.execute(text('''select last_value from data_version'''))).scalar()
+        _version = (monotonic(), version)
+    return _version[1]
+
+# endpoint (method and route path) and params (pydantic models as json), in a stable order
+def cache_key(endpoint: str, params: dict, version: int) -> str:
+    normalized = json.dumps(jsonable_encoder(params), sort_keys=True, separators=(',', ':'))
+    return blake2b(f'{endpoint}|{normalized}|{version}'.encode(), digest_size=16).hexdigest()
+
+# cache a route's response; the request/response parameters are added for fastapi, and are None when called directly (not cached)
+def cached(route):
+    signature = inspect.signature(route)
+    names = list(signature.parameters)
+
+    @wraps(route)
+    async def wrapper(*args, request: Request=None, response: Response=None, **kwargs):
+        if request is None:
+            return await route(*args, **kwargs)
+
+        try:
+            # route template (i.e. /api/token/price/{token_id}), since handler names are not unique
+            params = dict(zip(names, args), **kwargs)
+            endpoint = f'''{request.method} {getattr(request.scope.get('route'), 'path', request.url.path)}'''
+            key = cache_key(endpoint, params, await data_version())
+        except Exception as e:
+            logger.warning(f'cache: {route.__name__} not cached; {e}')
+            return await route(*args, **kwargs)
+
+        etag = f'"{key}"'
+        if etag in [t.strip() for t in request.headers.get('if-none-match', '').split(',')]:
+            return Response(status_code=304, headers={'ETag': etag})
+
+        value = CACHE.get(key)
+        if value is None:
+            value = jsonable_encoder(await route(*args, **kwargs))
+            if value is not None:
+                CACHE.put(key, value)
+        if value is not None:
+            response.headers['ETag'] = etag
+        return value
+
+    wrapper.__signature__ = signature.replace(parameters=list(signature.parameters.values()) + [
+        inspect.Parameter('request', inspect.Parameter.KEYWORD_ONLY, annotation=Request, default=None),
+        inspect.Parameter('response', inspect.Parameter.KEYWORD_ONLY, annotation=Response, default=None),
+    ])
+    return wrapper
@@ -1,5 +1,10 @@
+import csv
+import io
+import re
+
 from os import path, listdir, getenv
 from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.schema import DropTable
 from sqlalchemy.ext.compiler import compiles
 from utils.logger import logger, myself
@@ -14,10 +19,71 @@ DB_POSTGRES = f"postgresql://{getenv('POSTGRES_USER')}:{getenv('POSTGRES_PASSWOR
 eng = create_engine(DB_DANAIDES)
 eng_pg = create_engine(DB_POSTGRES)
 
+# api routes use the async engine (asyncpg), so a slow query does not block the event loop; main and plugins use eng
+API_POOL_SIZE = int(getenv('API_POOL_SIZE', 10)) # connections per api worker
+API_POOL_OVERFLOW = int(getenv('API_POOL_OVERFLOW', 10)) # extra connections under load, closed when returned
+API_STATEMENT_TIMEOUT = int(getenv('API_STATEMENT_TIMEOUT', 30000)) # ms; 0 for none
+aeng = create_async_engine(
+    DB_DANAIDES.replace('postgresql://', 'postgresql+asyncpg://', 1),
+    pool_size=API_POOL_SIZE,
+    max_overflow=API_POOL_OVERFLOW,
+    pool_pre_ping=True,
+    connect_args={'server_settings': {'statement_timeout': str(API_STATEMENT_TIMEOUT)}},
+)
+INCREMENTAL_VIEWS = getenv('INCREMENTAL_VIEWS', 'False').lower() in ('true', '1', 't') # these views are tables, maintained by delta (see utils/incremental.py)
+INCREMENTAL_TABLES = ['balances', 'staking', 'vesting']
+
+# unlogged staging tables in checkpoint schema; truncated and bulk loaded with COPY, never dropped
+STAGING = {
+    'boxes': '''
+        box_id varchar(64)
+        , height int
+        , nerg bigint
+        , is_unspent boolean
+    ''',
+    'tokens': '''
+        token_id varchar(64)
+        , height int
+        , amount bigint
+        , token_name varchar(1024)
+        , decimals bigint
+    ''',
+    'utxos': '''
+        box_id varchar(64)
+        , ergo_tree text
+        , address varchar(64)
+        , nergs bigint
+        , registers text
+        , assets text
+        , transaction_id varchar(64)
+        , box_index int
+        , creation_height int
+        , height int
+    ''',
+    'utxo_registers': '''
+        box_id varchar(64)
+        , register varchar(2)
+        , type smallint
+        , token_id varchar(64)
+        , coll_byte text
+        , long bigint
+        , coll_long text
+    ''',
+    'incremental_boxes': 'box_id varchar(64)',
+    'incremental_tokens': 'token_id varchar(64)',
+    'incremental_addresses': 'address varchar(64)',
+}
+STAGING['tokens_refresh'] = STAGING['tokens']
+COPY_NULL = '\\N' # so that empty strings stay empty strings
+
 @compiles(DropTable, "postgresql")
 def _compile_drop_table(element, compiler, **kwargs):
     return compiler.visit_drop_table(element) + " CASCADE"
 
+# api responses are cached per data version (see utils/cache.py); bump after writes that change what endpoints return
+def bump_data_version(con):
+    con.execute('''select nextval('data_version')''')
+
 # create db objects if they don't exists
 def init_db():
     # handle permissions in case using non-danaides db
@@ -77,6 +143,25 @@ def init_db():
         pass
 
 
+    # staging tables; replace any left behind by pandas to_sql (logged, with index column)
+    try:
+        logger.debug(f'creating staging tables')
+        sql = f'''
+            select table_name
+            from information_schema.columns
+            where table_schema = 'checkpoint'
+                and column_name = 'index'
+        '''
+        with eng.begin() as con:
+            for r in con.execute(sql).fetchall():
+                if r['table_name'] in STAGING:
+                    con.execute(f'''drop table if exists checkpoint.{r['table_name']}''')
+            for tbl in STAGING:
+                create_staging(con, tbl)
+
+    except Exception as e:
+        logger.error(f'ERR: {e}')
+
     # build tables, if needed
     try:
         logger.debug(f'deprecated - getting metadata')
@@ -113,6 +198,13 @@ def init_db():
                     logger.debug(f'creating matview {v}')
                     with open(path.join(view_dir, v), 'r') as f:
                         sql = f.read()
+
+                    # same definition as a regular table; filled and kept current by main (utils/incremental.py)
+                    name = re.search(r'create materialized view\s+(\w+)', sql, re.IGNORECASE)
+                    if name is not None and name.group(1) in INCREMENTAL_TABLES:
+                        con.execute(f'''drop table if exists {name.group(1)} cascade''')
+                        if INCREMENTAL_VIEWS:
+                            sql = re.sub(r'create materialized view', 'create table', sql, count=1, flags=re.IGNORECASE)
                     con.execute(sql)
 
     except Exception as e:
@@ -156,3 +248,23 @@ async def build_indexes():
     except Exception as e:
         logger.error(f'ERR: {e}')
 
+
+def create_staging(con, table: str, schema: str=None):
+    con.execute(f'''create unlogged table if not exists checkpoint.{table} ({STAGING[schema or table]})''')
+
+# bulk load rows (tuples, in column order) into checkpoint.{table} using COPY; caller owns the transaction
+def copy_rows(con, table: str, columns: list, rows, schema: str=None) -> int:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    count = 0
+    for row in rows:
+        writer.writerow([COPY_NULL if v is None else v for v in row])
+        count += 1
+    buf.seek(0)
+
+    create_staging(con, table, schema)
+    con.execute(f'''truncate table checkpoint.{table}''')
+    cur = con.connection.cursor()
+    cur.copy_expert(f'''copy checkpoint.{table} ({', '.join(columns)}) from stdin with (format csv, null '{COPY_NULL}')''', buf)
+
+    return count
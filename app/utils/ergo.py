@@ -3,6 +3,8 @@ from base58 import b58encode
 from os import getenv
 from utils.logger import logger
 from time import sleep
+from hashlib import blake2b
+from functools import lru_cache
 
 NODE_API = f'''http://{getenv('NODE_URL')}:{getenv('NODE_PORT')}'''
 NERGS2ERGS = 10**9
@@ -17,9 +19,78 @@ class AddressKind():
   P2SH = 2
   P2S = 3
 
+# sigma type codes for the register shapes decoded at ingestion (see decode_register)
+class RegisterType():
+  Int = 0x04
+  Long = 0x05
+  CollByte = 0x0e
+  CollLong = 0x11
+
+NETWORK = Network.Testnet if getenv('ERGO_NETWORK', 'mainnet').lower() == 'testnet' else Network.Mainnet
+ADDRESS_CACHE = 2**16 # pubkey -> address entries kept in process
+
 def b58(n): 
     return b58encode(bytes.fromhex(n)).decode('utf-8')
 
+# P2PK address for a public key (hex), as node /utils/rawToAddress; checksum is first 4 bytes of blake2b256(prefix+content)
+# only compressed secp256k1 keys (33 bytes, 02/03 prefix), which the node accepts; '' otherwise
+@lru_cache(maxsize=ADDRESS_CACHE)
+def raw_to_address(pubkey: str, network: int=NETWORK) -> str:
+    try:
+        pk = bytes.fromhex(pubkey)
+        if len(pk) != 33 or pk[0] not in (2, 3):
+            raise ValueError('not a compressed public key')
+        content = bytes([network + AddressKind.P2PK]) + pk
+        checksum = blake2b(content, digest_size=32).digest()[:4]
+        return b58encode(content + checksum).decode('utf-8')
+
+    except Exception as e:
+        logger.warning(f'raw_to_address: invalid public key {pubkey}; {e}')
+        return ''
+
+# unsigned VLQ at pos; returns (value, next pos)
+def _vlq(data: bytes, pos: int) -> tuple:
+    value = shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        value |= (b & 0x7f) << shift
+        if b & 0x80 == 0:
+            return value, pos
+        shift += 7
+
+def _zigzag(n: int) -> int:
+    return (n >> 1) ^ -(n & 1)
+
+# serialized register constant (hex) -> (RegisterType, value) for Int, Long (int), Coll[Byte] (bytes), Coll[Long] (list); (None, None) for anything else
+def decode_register(serialized: str) -> tuple:
+    try:
+        data = bytes.fromhex(serialized)
+        kind = data[0]
+        if kind in (RegisterType.Int, RegisterType.Long):
+            n, pos = _vlq(data, 1)
+            value = _zigzag(n)
+        elif kind == RegisterType.CollByte:
+            n, pos = _vlq(data, 1)
+            value = data[pos:pos+n]
+            pos += n
+            if len(value) != n: return None, None
+        elif kind == RegisterType.CollLong:
+            n, pos = _vlq(data, 1)
+            value = []
+            for i in range(n):
+                v, pos = _vlq(data, pos)
+                value.append(_zigzag(v))
+        else:
+            return None, None
+
+        # trailing bytes mean this was some other shape
+        if pos != len(data): return None, None
+        return kind, value
+
+    except (ValueError, IndexError):
+        return None, None
+
 # Attempt to get basic node info.
 # Wait until node responds reasonably, since nothing will work if the connection is gone
 def get_node_info():
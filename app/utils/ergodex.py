@@ -181,7 +181,7 @@ def getErgodexPoolBox():
                 , assets
                 , registers as "additionalRegisters"
             from utxos 
-            where ergo_tree = '{POOL_SAMPLE}'
+            where ergo_tree_hash = sha256(decode('{POOL_SAMPLE}', 'hex'))
                 and registers ? 'R4' -- avoid box 378483f674a1463ea63f0aa37a20d6410d1d99e5d9d16fe091a5c23e9849f964
         '''
         with eng.begin() as con: 
@@ -189,13 +189,14 @@ def getErgodexPoolBox():
 
         sql = f'''
             with 
-            -- parse out assets (hstore)
+            -- pool box assets (utxo_assets)
             tok as (
-                select distinct (each(assets)).key as token_id
-                    , (each(assets)).value::bigint as amount
-                    , height
+                select distinct a.token_id
+                    , a.amount
+                    , u.height
                 from utxos u
-                where ergo_tree = '{POOL_SAMPLE}'
+                    join utxo_assets a on a.box_id = u.box_id
+                where ergo_tree_hash = sha256(decode('{POOL_SAMPLE}', 'hex'))
             )
             -- help find most recent value by height
             , u as (
@@ -0,0 +1,140 @@
+import re
+
+from os import path
+from utils.db import eng, copy_rows, INCREMENTAL_TABLES
+from utils.logger import logger
+from utils.refresh import ChangeSet, VIEW_DIR
+
+"""
+incremental.py
+--------------
+
+- balances, staking and vesting as regular tables (INCREMENTAL_VIEWS; see utils/db.init_db), kept current from the boxes created and spent since the last pass
+- the select from each sql/views definition is reused; within it, utxos/utxo_assets/utxo_registers are shadowed by CTEs holding only the boxes involved
+- involved: changed boxes, boxes whose R5 references a token in a changed box (stake/vesting keys), and every box of a changed address
+- rows for affected keys (address for balances; box_id for staking, vesting) are deleted and selected again
+- every CHECK_INTERVAL passes, compare with a full select, log any difference and recompute
+
+"""
+
+#region INIT
+CHECK_INTERVAL = 100 # passes between full consistency checks
+KEYS = {
+    'balances': 'address',
+    'staking': 'box_id',
+    'vesting': 'box_id',
+}
+SHADOW = '''
+    _boxes as (
+        select box_id from checkpoint.incremental_boxes
+        union
+        select r.box_id
+        from public.utxo_registers r
+            join checkpoint.incremental_tokens t on t.token_id = r.token_id
+        where r.register = 'R5'
+    )
+    , utxos as (
+        select *
+        from public.utxos
+        where box_id in (select box_id from _boxes)
+            or address in (select address from checkpoint.incremental_addresses)
+    )
+    , utxo_registers as (
+        select * from public.utxo_registers where box_id in (select box_id from utxos)
+    )
+    , utxo_assets as (
+        select *
+        from public.utxo_assets
+        where box_id in (select box_id from utxos)
+            or token_id in (select token_id from utxo_registers where token_id is not null)
+    )
+'''
+AFFECTED = {
+    'address': 'select address from checkpoint.incremental_addresses',
+    'box_id': 'select box_id from _boxes union select box_id from utxos',
+}
+PASSES = 0
+RECOMPUTE = False # set after a failed pass
+#endregion INIT
+
+#region FUNCTIONS
+
+# select part of a matview definition (between "as" and "with [no] data")
+def view_select(name: str, view_dir: str=VIEW_DIR) -> str:
+    for prefix in ('d_', 'd__', 'd___'):
+        filename = path.join(view_dir, f'{prefix}{name}.sql')
+        if path.exists(filename):
+            with open(filename, 'r') as f:
+                sql = re.sub(r'--.*', '', f.read())
+            return re.search(r'create materialized view\s+\w+\s+as\s+(.*?)\bwith\s+(?:no\s+)?data\s*;', sql, re.IGNORECASE | re.DOTALL).group(1)
+
+    raise ValueError(f'no definition for {name} in {view_dir}')
+
+# replace all rows
+def recompute(con, tbl: str, select: str):
+    con.execute(f'''delete from {tbl}''')
+    con.execute(f'''insert into {tbl} select * from ({select}) v''')
+
+# rows that differ from a full select
+def difference(con, tbl: str, select: str) -> int:
+    sql = f'''
+        select (select count(*) from (select * from {tbl} except all select * from ({select}) v) a)
+            + (select count(*) from (select * from ({select}) v except all select * from {tbl}) b) as i
+    '''
+    return con.execute(sql).fetchone()['i']
+
+# bring the tables up to date with changes (before the matview scheduler clears them)
+def apply(changes: ChangeSet, tables: list=INCREMENTAL_TABLES):
+    global PASSES, RECOMPUTE
+    try:
+        selects = {tbl: view_select(tbl) for tbl in tables}
+        PASSES += 1
+
+        # startup, or too many boxes to list
+        if changes.everything or RECOMPUTE:
+            RECOMPUTE = False
+            for tbl in tables:
+                with eng.begin() as con:
+                    recompute(con, tbl, selects[tbl])
+                logger.info(f'incremental:: {tbl} recomputed')
+            return
+
+        if len(changes.boxes) > 0:
+            with eng.begin() as con:
+                copy_rows(con, 'incremental_boxes', ['box_id'], ((b,) for b in changes.boxes))
+                copy_rows(con, 'incremental_tokens', ['token_id'], ((t,) for t in changes.box_tokens))
+                copy_rows(con, 'incremental_addresses', ['address'], ((a,) for a in changes.addresses))
+
+                for tbl in tables:
+                    key = KEYS[tbl]
+                    con.execute(f'''
+                        with {SHADOW}, affected as ({AFFECTED[key]})
+                        delete from public.{tbl} t
+                        using affected a
+                        where a.{key} = t.{key}
+                    ''')
+                    con.execute(f'''
+                        with {SHADOW}, affected as ({AFFECTED[key]})
+                        insert into public.{tbl}
+                            select v.*
+                            from ({selects[tbl]}) v
+                            where v.{key} in (select {key} from affected)
+                    ''')
+
+            logger.debug(f'''incremental:: {', '.join(tables)} updated for {len(changes.boxes)} boxes''')
+
+        # consistency check
+        if PASSES % CHECK_INTERVAL == 0:
+            for tbl in tables:
+                with eng.begin() as con:
+                    diff = difference(con, tbl, selects[tbl])
+                    if diff > 0:
+                        logger.warning(f'incremental:: {tbl} differs from full select by {diff} rows; recomputing')
+                        recompute(con, tbl, selects[tbl])
+
+    except Exception as e:
+        logger.error(f'ERR: incremental {e}')
+        # next pass starts over
+        RECOMPUTE = True
+
+#endregion FUNCTIONS
@@ -0,0 +1,189 @@
+import re
+
+from os import listdir, path
+from concurrent.futures import ThreadPoolExecutor
+from utils.logger import logger
+
+"""
+refresh.py
+----------
+
+- refresh only the materialized views whose inputs changed; dependencies first, independent views in parallel
+- graph from the sql/views definitions: a view depends on every table or matview it reads (from/join, outside comments, minus its own CTEs)
+- a view is dirty when a table it reads changed, or a view it reads is dirty
+- "-- refresh-when: trees tokens" narrows a view to boxes with the ergo trees and/or tokens written as literals in its file (only when every read is filtered by them)
+- "-- refresh-when: never" for views with static content
+- writers record what they change in CHANGES (plugins/utxo, plugins/token, plugins/prices); the scheduler clears it after each refresh
+
+"""
+
+#region INIT
+VIEW_DIR = '/app/sql/views'
+REFRESH_WORKERS = 4 # views refreshed at once, per dependency level
+UTXO_TABLES = ('utxos', 'utxo_assets', 'utxo_registers') # narrowed by refresh-when
+BOX_LIMIT = 100000 # changed boxes listed individually (see utils/incremental.py); beyond this, everything changed
+#endregion INIT
+
+# what changed since the last refresh; trees/tokens only kept for those being watched
+# boxes, addresses and box_tokens list every changed box, for tables maintained by delta
+class ChangeSet:
+    __slots__ = ('everything', 'tables', 'trees', 'tokens', 'boxes', 'addresses', 'box_tokens', '_trees', '_tokens')
+
+    def __init__(self):
+        self.everything = True # nothing known about the views yet (i.e. first refresh after startup)
+        self.tables = set()
+        self.trees = set()
+        self.tokens = set()
+        self.boxes = set()
+        self.addresses = set()
+        self.box_tokens = set()
+        self._trees = None
+        self._tokens = None
+
+    # only keep trees/tokens some view cares about
+    def watch(self, trees: set, tokens: set):
+        self._trees = trees
+        self._tokens = tokens
+
+    def all(self):
+        self.everything = True
+
+    # a created or spent box
+    def box(self, box_id: str, ergo_tree: str, address: str, tokens):
+        self.tables.update(UTXO_TABLES)
+        if not self.everything:
+            if len(self.boxes) < BOX_LIMIT:
+                self.boxes.add(box_id)
+                if address != '': self.addresses.add(address)
+                self.box_tokens.update(tokens)
+            else:
+                self.all()
+        if self._trees is None or ergo_tree in self._trees:
+            self.trees.add(ergo_tree)
+        for token_id in tokens:
+            if self._tokens is None or token_id in self._tokens:
+                self.tokens.add(token_id)
+
+    # a token row (i.e. minted, price)
+    def token(self, token_id: str):
+        self.tables.add('tokens')
+        if self._tokens is None or token_id in self._tokens:
+            self.tokens.add(token_id)
+
+    def clear(self):
+        self.everything = False
+        self.tables.clear()
+        self.trees.clear()
+        self.tokens.clear()
+        self.boxes.clear()
+        self.addresses.clear()
+        self.box_tokens.clear()
+
+CHANGES = ChangeSet()
+
+class View:
+    __slots__ = ('name', 'reads', 'when', 'trees', 'tokens')
+
+    def __init__(self, name: str, reads: set, when: set, trees: set, tokens: set):
+        self.name = name
+        self.reads = reads
+        self.when = when
+        self.trees = trees
+        self.tokens = tokens
+
+    # changed by these changes, ignoring other views
+    def changed(self, changes: ChangeSet) -> bool:
+        if 'never' in self.when:
+            return False
+        tables = self.reads & changes.tables
+        if len(tables) == 0:
+            return False
+
+        # narrowing only covers utxo tables and tokens (keyed by the same token literals)
+        if len(self.when) == 0 or len(tables - set(UTXO_TABLES) - {'tokens'}) > 0:
+            return True
+        if 'trees' in self.when and len(self.trees & changes.trees) > 0:
+            return True
+        if 'tokens' in self.when and len(self.tokens & changes.tokens) > 0:
+            return True
+        return False
+
+# matview name -> View, from create materialized view statements
+def load_views(view_dir: str=VIEW_DIR) -> dict:
+    views = {}
+    for v in sorted(listdir(view_dir)):
+        if v.startswith('d_') and v.endswith('.sql'):
+            with open(path.join(view_dir, v), 'r') as f:
+                sql = f.read()
+            name = re.search(r'create materialized view\s+(\w+)', sql, re.IGNORECASE)
+            if name is None:
+                continue
+
+            when = set()
+            for w in re.findall(r'--\s*refresh-when:\s*(.+)', sql):
+                when.update(w.split())
+            body = re.sub(r'--.*', '', sql)
+            ctes = set(re.findall(r'(\w+)\s+as\s*\(', body, re.IGNORECASE))
+            reads = set(re.findall(r'\b(?:from|join)\s+(\w+)', body, re.IGNORECASE)) - ctes - {name.group(1)}
+            trees = set(re.findall(r"decode\('([0-9a-f]+)',\s*'hex'\)", body))
+            tokens = set(re.findall(r"'([0-9a-f]{64})'", body))
+            views[name.group(1)] = View(name.group(1), reads, when, trees, tokens)
+
+    return views
+
+class RefreshScheduler:
+    def __init__(self, targets: list, refresh, view_dir: str=VIEW_DIR, workers: int=REFRESH_WORKERS, changes: ChangeSet=CHANGES):
+        self.views = load_views(view_dir)
+        self.targets = [t for t in targets if t in self.views]
+        self.refresh_view = refresh # callable(view name) -> bool
+        self.workers = workers
+        self.changes = changes
+        self.retry = set() # failed last time
+        for t in targets:
+            if t not in self.views: logger.warning(f'refresh: no definition for matview {t}; skipped')
+
+        trees, tokens = set(), set()
+        for v in self.views.values():
+            if 'trees' in v.when: trees |= v.trees
+            if 'tokens' in v.when: tokens |= v.tokens
+        self.changes.watch(trees, tokens)
+
+    # dirty targets grouped by dependency level; views in a level do not read each other
+    def plan(self, changes: ChangeSet) -> list:
+        dirty = {}
+        def is_dirty(name: str, seen: tuple=()) -> bool:
+            if name not in dirty:
+                v = self.views[name]
+                deps = [r for r in v.reads if r in self.views and r not in seen]
+                dirty[name] = (changes.everything and 'never' not in v.when) or name in self.retry or v.changed(changes) or any([is_dirty(d, seen+(name,)) for d in deps])
+            return dirty[name]
+
+        level = {}
+        def depth(name: str, seen: tuple=()) -> int:
+            if name not in level:
+                deps = [r for r in self.views[name].reads if r in self.targets and r not in seen]
+                level[name] = 1 + max([depth(d, seen+(name,)) for d in deps], default=-1)
+            return level[name]
+
+        levels = {}
+        for t in self.targets:
+            if is_dirty(t):
+                levels.setdefault(depth(t), []).append(t)
+        return [levels[l] for l in sorted(levels)]
+
+    # refresh what changed; returns views refreshed
+    def refresh(self) -> list:
+        levels = self.plan(self.changes)
+        skipped = [t for t in self.targets if not any([t in l for l in levels])]
+        if len(skipped) > 0: logger.debug(f'''refresh: unchanged {', '.join(skipped)}''')
+        self.changes.clear()
+        self.retry.clear()
+
+        refreshed = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for views in levels:
+                for view, ok in zip(views, pool.map(self.refresh_view, views)):
+                    if ok: refreshed.append(view)
+                    # refresh again next time, along with anything reading it
+                    else: self.retry.add(view)
+        return refreshed
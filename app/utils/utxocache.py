@@ -0,0 +1,109 @@
+import os
+import sqlite3
+import tempfile
+
+from utils.logger import logger
+from utils.boxset import BoxSet
+
+"""
+utxocache.py
+------------
+
+- in-process utxo set that spans checkpoint windows; boxes created and spent between flushes never reach postgres
+- keys are 32 byte box ids (not 64 char hex)
+- when more than max_boxes are held in memory, the oldest created boxes spill to a sqlite file
+
+"""
+
+#region INIT
+MAX_BOXES = 2000000 # boxes held in memory before spilling to disk
+#endregion INIT
+
+class UtxoCache:
+    def __init__(self, max_boxes: int=MAX_BOXES, spill_dir: str=None):
+        self.max_boxes = max_boxes
+        self.spill_dir = spill_dir
+        self._created = {} # box_id -> (height, nergs); created since last flush
+        self._spent = set() # box_id; spent, but created before last flush (must be removed from postgres)
+        self._spill = None
+        self._spill_path = None
+        self._spilled = 0
+
+    def __len__(self):
+        return len(self._created) + self._spilled + len(self._spent)
+
+    def add(self, box_id: str, height: int, nergs: int):
+        self._add(bytes.fromhex(box_id), height, nergs)
+
+    def spend(self, box_id: str):
+        self._spend(bytes.fromhex(box_id))
+
+    # a window's working set (height -1 indicates spent), without converting box ids
+    # boxes created and spent within the window are skipped; except those from its first block, which may repeat the previous window's last block
+    def apply(self, window: BoxSet, first_height: int):
+        transient = window.transient()
+        for key, height, nergs in window.keyed_rows():
+            if height != -1: self._add(key, height, nergs)
+            elif transient.get(key, first_height) <= first_height: self._spend(key)
+
+    def _add(self, key: bytes, height: int, nergs: int):
+        self._created[key] = (height, nergs)
+        if len(self._created) > self.max_boxes:
+            self._spill_oldest()
+
+    # resolve locally when the box was created since last flush; otherwise remember to remove it
+    def _spend(self, key: bytes):
+        if self._created.pop(key, None) is not None:
+            return
+        if self._spilled > 0 and self._unspill(key):
+            return
+        self._spent.add(key)
+
+    # net changes since last flush, in checkpoint format (height -1 indicates spent); resets the cache
+    def drain(self) -> BoxSet:
+        delta = BoxSet()
+        for key in self._spent:
+            delta._set(key, -1, 0)
+        if self._spilled > 0:
+            for key, height, nergs in self._spill.execute('select box_id, height, nergs from boxes'):
+                delta._set(key, height, nergs)
+            self._spill.execute('delete from boxes')
+            self._spilled = 0
+        for key, (height, nergs) in self._created.items():
+            delta._set(key, height, nergs)
+
+        self._created = {}
+        self._spent = set()
+        return delta
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            os.remove(self._spill_path)
+            self._spill = None
+
+    # move the oldest half of created boxes to disk (dicts keep insertion order)
+    def _spill_oldest(self):
+        if self._spill is None:
+            fd, self._spill_path = tempfile.mkstemp(prefix='utxocache_', suffix='.sqlite', dir=self.spill_dir)
+            os.close(fd)
+            self._spill = sqlite3.connect(self._spill_path, check_same_thread=False)
+            self._spill.execute('pragma journal_mode = off')
+            self._spill.execute('pragma synchronous = off')
+            self._spill.execute('create table if not exists boxes (box_id blob primary key, height integer, nergs integer)')
+
+        count = len(self._created)//2
+        keys = []
+        for key in self._created:
+            keys.append(key)
+            if len(keys) >= count:
+                break
+        self._spill.executemany('insert or replace into boxes (box_id, height, nergs) values (?, ?, ?)', [(k, *self._created.pop(k)) for k in keys])
+        self._spilled += len(keys)
+        logger.debug(f'utxo cache: spilled {len(keys)} boxes to disk ({self._spilled} on disk)')
+
+    def _unspill(self, key: bytes) -> bool:
+        found = self._spill.execute('delete from boxes where box_id = ?', (key,)).rowcount > 0
+        if found:
+            self._spilled -= 1
+        return found
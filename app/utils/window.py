@@ -0,0 +1,57 @@
+from utils.logger import logger
+
+"""
+window.py
+---------
+
+- size of the next block window, from what the last windows cost
+- each measure (transactions, working set boxes, fetch seconds, checkpoint seconds) suggests a size that meets its target; the smallest wins
+- grows at most GROWTH x per window, shrinks immediately; always within min_size..max_size
+
+"""
+
+#region INIT
+MIN_SIZE = 50
+MAX_SIZE = 5000
+TARGET_TRANSACTIONS = 50000 # per window
+TARGET_BOXES = 500000 # working set entries per window (memory)
+TARGET_FETCH = 15 # seconds to fetch a window
+TARGET_CHECKPOINT = 15 # seconds to write a window
+GROWTH = 2
+#endregion INIT
+
+class WindowSizer:
+    def __init__(self, size: int, min_size: int=MIN_SIZE, max_size: int=MAX_SIZE, verbose: bool=False):
+        self.min_size = min_size
+        self.max_size = max(min_size, max_size)
+        self.size = self._clamp(size)
+        self.verbose = verbose
+        self._suggested = {}
+
+    def _clamp(self, size: float) -> int:
+        return int(min(self.max_size, max(self.min_size, size)))
+
+    # fetch stage: seconds to download a window of blocks
+    def fetched(self, blocks: int, seconds: float):
+        if blocks > 0 and seconds > 0:
+            self._suggested['fetch'] = blocks*TARGET_FETCH/seconds
+
+    # apply stage: transactions seen and boxes in the working set for a window of blocks
+    def applied(self, blocks: int, transactions: int, boxes: int):
+        if blocks > 0:
+            self._suggested['transactions'] = blocks*TARGET_TRANSACTIONS/max(1, transactions)
+            self._suggested['boxes'] = blocks*TARGET_BOXES/max(1, boxes)
+            self._resize()
+
+    # write stage: seconds to checkpoint a window of blocks
+    def written(self, blocks: int, seconds: float):
+        if blocks > 0 and seconds > 0:
+            self._suggested['checkpoint'] = blocks*TARGET_CHECKPOINT/seconds
+            self._resize()
+
+    def _resize(self):
+        limit, suggested = min(self._suggested.items(), key=lambda s: s[1])
+        size = self._clamp(min(suggested, self.size*GROWTH))
+        if size != self.size:
+            if self.verbose: logger.debug(f'window size {self.size} -> {size} (limited by {limit})')
+            self.size = size
@@ -24,9 +24,12 @@ def refresh_matview(matview):
         with eng.begin() as con:
             sql = f'''refresh materialized view concurrently {matview}'''
             con.execute(sql)
+            # cached api responses are stale (see app/utils/cache.py)
+            con.execute('''select nextval('data_version')''')
 
     except Exception as e:
         logging.error(f'ERR: {myself()}; {e}')
+        raise # task state FAILURE, so the api reports the refresh as failed
 
 @app.task
 def refresh_all_matviews():